@@ -0,0 +1,261 @@
+"""
+Admission Control for Small Calls System
+Per-client rate limits and load shedding in front of voice generation
+"""
+
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed before any synthesis work starts
+    retry_after is None when retrying cannot help (request larger than the burst limit)
+    """
+
+    def __init__(self, status_code: int, reason: str, retry_after: Optional[float] = 1.0):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket weighted by request cost
+    One token = one character to synthesize
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def try_consume(self, cost: float) -> float:
+        """
+        Consume cost tokens if available
+        Returns 0.0 on success, otherwise seconds until the cost is affordable
+        """
+        now = time.monotonic()
+        self._refill(now)
+
+        if cost <= self.tokens:
+            self.tokens -= cost
+            return 0.0
+
+        if cost > self.capacity or self.rate <= 0:
+            return float('inf')
+        return (cost - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Professional admission control for business voice endpoints
+    Token bucket per API key + global in-flight cap + queue-depth shedding.
+    Standard and bulk work may hold at most max_background_in_flight slots, so
+    interactive calls always find the rest free
+    """
+
+    def __init__(self,
+                 chars_per_second: float = 200.0,
+                 burst_chars: float = 2000.0,
+                 max_in_flight: int = 4,
+                 max_queue_depth: int = 8,
+                 queue_timeout: float = 2.0,
+                 max_clients: int = 10000,
+                 max_background_in_flight: Optional[int] = None):
+        self.chars_per_second = chars_per_second
+        self.burst_chars = burst_chars
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+        self.max_background_in_flight = min(max_in_flight, max_background_in_flight or max(1, max_in_flight // 2))
+
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.in_flight = 0
+        self.background_in_flight = 0
+        self.queued = 0
+        # Called with (in_flight, queued) under the lock whenever either changes
+        self.on_load_change: Optional[Callable[[int, int], None]] = None
+        self.stats = {
+            'admitted': 0,
+            'rejected_rate_limit': 0,
+            'rejected_too_large': 0,
+            'rejected_queue_full': 0,
+            'rejected_queue_timeout': 0
+        }
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        """Build controller from environment settings"""
+        return cls(
+            chars_per_second=float(os.getenv('RATE_LIMIT_CHARS_PER_SEC', 200)),
+            burst_chars=float(os.getenv('RATE_LIMIT_BURST_CHARS', 2000)),
+            max_in_flight=int(os.getenv('MAX_IN_FLIGHT', 4)),
+            max_queue_depth=int(os.getenv('MAX_QUEUE_DEPTH', 8)),
+            queue_timeout=float(os.getenv('QUEUE_TIMEOUT', 2.0)),
+            max_background_in_flight=int(os.getenv('MAX_BACKGROUND_IN_FLIGHT', 0)) or None
+        )
+
+    def _bucket_for(self, client_key: str) -> TokenBucket:
+        bucket = self._buckets.get(client_key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                # Idle buckets have refilled anyway; evict the longest-idle ones
+                idle = sorted(self._buckets, key=lambda k: self._buckets[k].updated)
+                for key in idle[:len(idle) // 10 or 1]:
+                    del self._buckets[key]
+            bucket = TokenBucket(self.chars_per_second, self.burst_chars)
+            self._buckets[client_key] = bucket
+        return bucket
+
+    def charge(self, client_key: str, cost: int):
+        """Take cost characters from the client's rate limit or raise AdmissionRejected"""
+        cost = max(int(cost), 1)
+        if cost > self.burst_chars:
+            with self._lock:
+                self.stats['rejected_too_large'] += 1
+            # Would never fit the bucket, however long the client waits
+            raise AdmissionRejected(
+                413, f'Request cost {cost} exceeds burst limit {int(self.burst_chars)} characters; '
+                     f'split it into smaller requests', retry_after=None)
+        with self._lock:
+            wait = self._bucket_for(client_key).try_consume(cost)
+            if wait > 0:
+                self.stats['rejected_rate_limit'] += 1
+                # An infinite wait only happens with a zero refill rate
+                raise AdmissionRejected(429, 'Rate limit exceeded for client',
+                                        retry_after=wait if wait != float('inf') else None)
+
+    def refund(self, client_key: str, cost: int):
+        """Return characters for work that was shed or never ran"""
+        with self._lock:
+            bucket = self._buckets.get(client_key)
+            if bucket is not None:
+                bucket.tokens = min(bucket.capacity, bucket.tokens + max(int(cost), 1))
+
+    def _publish_load(self):
+        if self.on_load_change is not None:
+            self.on_load_change(self.in_flight, self.queued)
+
+    def _slot_busy(self, background: bool) -> bool:
+        return self.in_flight >= self.max_in_flight or \
+            (background and self.background_in_flight >= self.max_background_in_flight)
+
+    def _take_slot(self, background: bool):
+        with self._lock:
+            if self._slot_busy(background):
+                if self.queued >= self.max_queue_depth:
+                    self.stats['rejected_queue_full'] += 1
+                    raise AdmissionRejected(503, 'Server busy, queue full')
+
+                self.queued += 1
+                self._publish_load()
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self._slot_busy(background):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats['rejected_queue_timeout'] += 1
+                            raise AdmissionRejected(503, 'Server busy, queue wait timed out')
+                        self._slot_free.wait(remaining)
+                finally:
+                    self.queued -= 1
+                    self._publish_load()
+
+            self.in_flight += 1
+            if background:
+                self.background_in_flight += 1
+            self.stats['admitted'] += 1
+            self._publish_load()
+
+    def _release(self, background: bool):
+        with self._lock:
+            self.in_flight -= 1
+            if background:
+                self.background_in_flight -= 1
+            self._publish_load()
+            # Waiters differ in which slots they may take, so wake them all to re-check
+            self._slot_free.notify_all()
+
+    @contextmanager
+    def slot(self, priority: str = 'interactive'):
+        """
+        Hold one in-flight slot for the block, without charging the rate limit
+        Raises AdmissionRejected (503) when the queue is full or the wait times out
+        """
+        background = priority != 'interactive'
+        self._take_slot(background)
+        try:
+            yield
+        finally:
+            self._release(background)
+
+    @contextmanager
+    def admit(self, client_key: str, cost: int, priority: str = 'interactive'):
+        """
+        Admit a request costing `cost` characters or raise AdmissionRejected
+        Holds one in-flight slot for the duration of the block
+        """
+        self.charge(client_key, cost)
+        background = priority != 'interactive'
+        try:
+            self._take_slot(background)
+        except AdmissionRejected:
+            # Shed requests should not burn the client's budget
+            self.refund(client_key, cost)
+            raise
+        try:
+            yield
+        finally:
+            self._release(background)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current limits, load and rejection counts"""
+        with self._lock:
+            return {
+                'limits': {
+                    'chars_per_second': self.chars_per_second,
+                    'burst_chars': self.burst_chars,
+                    'max_in_flight': self.max_in_flight,
+                    'max_background_in_flight': self.max_background_in_flight,
+                    'max_queue_depth': self.max_queue_depth,
+                    'queue_timeout': self.queue_timeout
+                },
+                'in_flight': self.in_flight,
+                'background_in_flight': self.background_in_flight,
+                'queued': self.queued,
+                'tracked_clients': len(self._buckets),
+                'counters': dict(self.stats)
+            }
+
+
+def client_key_from_request(req: Any, trust_forwarded: bool = False) -> str:
+    """
+    Identify caller by API key header, falling back to remote address
+    trust_forwarded: request came from a cluster peer, so X-Forwarded-For holds the client address
+    """
+    api_key = req.headers.get('X-API-Key')
+    if api_key:
+        return f'key:{api_key}'
+    forwarded_for = req.headers.get('X-Forwarded-For') if trust_forwarded else None
+    if forwarded_for:
+        # The peer sends the address it saw; only the last hop is one we can vouch for
+        return f'addr:{forwarded_for.split(",")[-1].strip()}'
+    return f'addr:{req.remote_addr or "unknown"}'
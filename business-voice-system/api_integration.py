@@ -4,18 +4,39 @@ Professional Voice Cloning with snorTTS-Indic-v0
 """
 
 from flask import Flask, request, jsonify, send_file
+from flask_sock import Sock
 import io
+import json
 import base64
 import logging
 from typing import Dict, Any
+from contextlib import ExitStack
 import time
 import os
 import tempfile
+import threading
 
 # Import your voice cloner (assuming app.py is in same directory)
 import sys
 sys.path.append('.')
+
+# Per-worker thread limits must be in place before torch/NumPy start their pools
+from autotune import apply_tuned_config
+tuned_config = apply_tuned_config()
+
 from app import SnorTTSVoiceCloner
+from admission import AdmissionController, AdmissionRejected, client_key_from_request
+from call_log import CallLogStore, parse_time
+from shared_stats import SharedStats
+from synthesis_cache import SynthesisCache, request_key
+from cluster import ClusterRouter
+from code_switch import MixedLanguageRenderer
+from scheduler import PriorityScheduler, PRIORITY_CLASSES, estimate_cost
+from streaming import StreamingSession
+from voice_variants import validate_params, variant_params, is_default, within_safe_range, render_variant
+from audio_quality import analyze_wav, QualityStats, ReportCache
+from prewarm import Prewarmer, PrerenderStore
+from rtp import RTPStreamer, StopRelay, PAYLOAD_TYPES, SAMPLE_RATE as RTP_CLOCK_RATE, FRAME_MS as RTP_PTIME_MS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,46 +45,189 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max request
+sock = Sock(app)
+
+MAX_TEXT_LENGTH = 1000
+MAX_TEST_PHRASES = int(os.getenv('MAX_TEST_PHRASES', 50))
+
+# RTP output only goes to configured media gateways
+RTP_ALLOWED_HOSTS = {host.strip() for host in os.getenv('RTP_ALLOWED_HOSTS', '127.0.0.1').split(',') if host.strip()}
+MAX_RTP_STREAMS = int(os.getenv('MAX_RTP_STREAMS', 32))
+RTP_BUFFER_SECONDS = float(os.getenv('RTP_BUFFER_SECONDS', 2.0))
+rtp_streams: Dict[int, RTPStreamer] = {}
+rtp_lock = threading.Lock()
+rtp_totals = {'started': 0, 'completed': 0, 'stopped': 0, 'failed': 0}
+
+
+def stop_local_rtp_stream(ssrc: int):
+    with rtp_lock:
+        streamer = rtp_streams.get(ssrc)
+    if streamer is not None:
+        streamer.stop()
+    return streamer
+
+
+# Stop requests that land on another gunicorn worker are relayed to the owning one
+rtp_stop_relay = StopRelay.from_env(stop_local_rtp_stream)
+
+# Per-client rate limits and load shedding
+admission = AdmissionController.from_env()
 
 # Initialize voice cloner
 voice_cloner = SnorTTSVoiceCloner()
 voice_cloner.load_model()
 
+# Rendered audio cache and cache-affinity routing across nodes; the in-memory
+# cache is per worker, pre-rendered prompts are shared by all workers on the host
+synthesis_cache = SynthesisCache.from_env()
+prerender_store = PrerenderStore.from_env()
+cluster = ClusterRouter.from_env()
+
+# Live-call prompts go ahead of standard and bulk work on the synthesis workers
+synthesis_scheduler = PriorityScheduler.from_env()
+
+
+def render_with_report(text: str, language: str, rate: float = 1.0, pitch: float = 0.0,
+                       priority: str = 'standard'):
+    """Engine render on the priority scheduler; its acoustic report is kept for assess()"""
+    audio_bytes, report = synthesis_scheduler.run(
+        voice_cloner.render, text, language, rate, pitch,
+        cost=estimate_cost(text) / rate, priority=priority)
+    if not audio_bytes:
+        return None, 0.0
+    acoustic_reports.put(audio_bytes, report)
+    return audio_bytes, report['score']
+
+
+def synthesize(text: str, language: str, priority: str = 'standard'):
+    """
+    Generate voice through the local synthesis cache
+    Mixed Hindi-English text is split into spans that are cached individually;
+    cache misses queue on the priority scheduler
+    """
+    key = request_key(text, language)
+    cached = synthesis_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    # Rendered by this host's prewarming worker
+    prerendered = prerender_store.get(key)
+    if prerendered is not None:
+        synthesis_cache.put(key, *prerendered)
+        return prerendered
+    
+    if language == 'mixed':
+        audio_bytes, quality_score = mixed_renderer.render(text, priority=priority)
+    else:
+        audio_bytes, quality_score = render_with_report(text, language, priority=priority)
+    if audio_bytes:
+        synthesis_cache.put(key, audio_bytes, quality_score)
+    return audio_bytes, quality_score
+
+
+def synthesize_variant(text: str, language: str, priority: str = 'standard',
+                       rate: float = 1.0, pitch: float = 0.0, volume: float = 1.0):
+    """
+    Rate/pitch/volume variant of a prompt
+    Small changes are derived from the cached base rendering with DSP;
+    larger ones are re-synthesized by the engine at the requested rate and pitch.
+    Mixed text makes that choice per language span
+    """
+    if is_default(rate, pitch, volume):
+        return synthesize(text, language, priority)
+    
+    key = request_key(text, language, rate=rate, pitch=pitch, volume=volume)
+    cached = synthesis_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    if language == 'mixed':
+        audio_bytes, quality_score = mixed_renderer.render(text, priority=priority, rate=rate, pitch=pitch)
+        if audio_bytes and volume != 1.0:
+            audio_bytes = render_variant(audio_bytes, volume=volume)
+    elif within_safe_range(rate, pitch):
+        audio_bytes, quality_score = synthesize(text, language, priority)
+        if audio_bytes:
+            audio_bytes = render_variant(audio_bytes, rate, pitch, volume)
+    else:
+        audio_bytes, quality_score = render_with_report(text, language, rate, pitch, priority)
+        if audio_bytes and volume != 1.0:
+            audio_bytes = render_variant(audio_bytes, volume=volume)
+    
+    if audio_bytes:
+        synthesis_cache.put(key, audio_bytes, quality_score)
+    return audio_bytes, quality_score
+
+
+# Spans are single-language, so each one gets the cached base / DSP / re-synthesis path
+mixed_renderer = MixedLanguageRenderer.from_env(synthesize_variant)
+
+
+acoustic_stats = QualityStats()
+acoustic_reports = ReportCache()
+
+
+def assess(audio_bytes: bytes, text: str, rate: float = 1.0) -> Dict[str, Any]:
+    """
+    Acoustic analysis of the audio actually returned; its score is the reported quality_score
+    Audio the engine rendered and nothing altered since reuses the engine's report
+    """
+    expected_duration = estimate_cost(text) / rate
+    report = acoustic_reports.get(audio_bytes, expected_duration)
+    if report is not None:
+        acoustic_stats.record(report)
+        return report
+    started = time.perf_counter()
+    report = analyze_wav(audio_bytes, expected_duration)
+    acoustic_stats.record(report, time.perf_counter() - started)
+    acoustic_reports.put(audio_bytes, report)
+    return report
+
 class BusinessCallIntegration:
     """
     Professional API for Small Calls Integration
     80% Quality Target for Client Calls
     """
     
-    def __init__(self):
-        self.call_history = []
-        self.quality_stats = {
-            'total_calls': 0,
-            'avg_quality': 0.0,
-            'success_rate': 0.0
-        }
+    def __init__(self, shared: SharedStats, store: CallLogStore = None):
+        # Durable history lives in the call log store; live counters, histograms and
+        # the recent-call tail live in shared memory so every worker sees the whole host
+        self.store = store
+        self.shared = shared
     
-    def log_call(self, text: str, quality: float, success: bool):
+    @property
+    def quality_stats(self) -> Dict[str, Any]:
+        return self.shared.totals()
+    
+    def log_call(self, text: str, quality: float, success: bool,
+                 language: str = 'english', latency_ms: float = None):
         """Log call for monitoring and optimization"""
-        self.call_history.append({
+        record = {
             'timestamp': time.time(),
             'text': text[:100] + '...' if len(text) > 100 else text,
             'quality': quality,
             'success': success
-        })
-        
-        # Update stats
-        self.quality_stats['total_calls'] += 1
-        self.quality_stats['avg_quality'] = (
-            (self.quality_stats['avg_quality'] * (self.quality_stats['total_calls'] - 1) + quality) 
-            / self.quality_stats['total_calls']
-        )
+        }
+        if self.store is not None:
+            self.store.append(record['timestamp'], language, record['text'], quality, latency_ms, success)
         
-        success_count = sum(1 for call in self.call_history if call['success'])
-        self.quality_stats['success_rate'] = success_count / len(self.call_history)
+        # Update host-wide stats
+        self.shared.record(record['timestamp'], language, record['text'], quality, success, latency_ms)
 
 # Initialize call integration
-call_integration = BusinessCallIntegration()
+call_integration = BusinessCallIntegration(SharedStats.from_env(), CallLogStore.from_env())
+admission.on_load_change = call_integration.shared.set_load
+
+
+def live_traffic_idle() -> bool:
+    """No admitted or queued live requests on any worker of this host"""
+    return call_integration.shared.host_load() == 0
+
+
+# Demo catalog at startup, then the hottest logged prompts whenever idle
+prewarmer = Prewarmer.from_env(
+    synthesize, prerender_store, call_integration.store, live_traffic_idle,
+    owns=lambda key: not cluster.enabled or cluster.owner(key) == cluster.self_url).start()
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -72,7 +236,8 @@ def health_check():
         'status': 'healthy',
         'model': 'snorTTS-Indic-v0',
         'quality_target': '80%',
-        'stealth_mode': 'active'
+        'stealth_mode': 'active',
+        'prewarm': prewarmer.get_progress()
     })
 
 @app.route('/api/business-voice', methods=['POST'])
@@ -85,13 +250,18 @@ def generate_business_voice():
         "text": "Hello, this is regarding your account update.",
         "language": "english",  # optional: english, hindi, mixed
         "quality_target": 0.80,  # optional: 0.0-1.0
-        "format": "wav"  # optional: wav, mp3
+        "format": "wav",  # optional: wav, mp3
+        "priority": "interactive",  # optional: interactive, standard, bulk
+        "rate": 1.0,  # optional: speaking-rate multiplier 0.5-2.0
+        "pitch": 0.0,  # optional: semitones -12 to 12
+        "volume": 1.0  # optional: gain 0.0-2.0
     }
     
     Response:
     {
         "success": true,
-        "quality_score": 0.85,
+        "quality_score": 0.85,  # measured on the returned audio
+        "acoustic": {"clipping_ratio": 0.0, "silence_ratio": 0.02, "snr_db": 25.9, ...},
         "audio_base64": "UklGRiQAAABXQVZFZm10...",
         "message": "Voice generated successfully"
     }
@@ -113,37 +283,62 @@ def generate_business_voice():
                 'error': 'Text is required'
             }), 400
         
-        if len(text) > 1000:
+        if len(text) > MAX_TEXT_LENGTH:
             return jsonify({
                 'success': False,
-                'error': 'Text too long (max 1000 characters)'
+                'error': f'Text too long (max {MAX_TEXT_LENGTH} characters)'
             }), 400
         
         # Extract parameters
         language = data.get('language', 'english')
         quality_target = data.get('quality_target', 0.80)
         audio_format = data.get('format', 'wav')
+        priority = data.get('priority', 'interactive')
+        
+        if priority not in PRIORITY_CLASSES:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown priority (use one of {", ".join(PRIORITY_CLASSES)})'
+            }), 400
+        
+        prosody = variant_params(data)
+        prosody_error = validate_params(**prosody)
+        if prosody_error:
+            return jsonify({
+                'success': False,
+                'error': prosody_error
+            }), 400
+        
+        # Let the node that owns this prompt synthesize (and cache) it
+        forwarded = cluster.forward(request, request_key(text, language))
+        if forwarded is not None:
+            return forwarded
         
         logger.info(f"Generating voice for: '{text[:50]}...' in {language}")
         
         # Generate voice
-        audio_bytes, quality_score = voice_cloner.generate_voice(text, language)
+        with admission.admit(client_key_from_request(request, cluster.is_peer_forwarded(request)), len(text), priority):
+            started = time.perf_counter()
+            audio_bytes, quality_score = synthesize_variant(text, language, priority, **prosody)
+            latency_ms = (time.perf_counter() - started) * 1000
         
         if not audio_bytes:
-            call_integration.log_call(text, 0.0, False)
+            call_integration.log_call(text, 0.0, False, language, latency_ms)
             return jsonify({
                 'success': False,
                 'error': 'Voice generation failed'
             }), 500
         
-        # Check quality target
+        # Check quality target against the measured audio
+        acoustic = assess(audio_bytes, text, prosody['rate'])
+        quality_score = acoustic['score']
         meets_target = quality_score >= quality_target
         
         # Convert audio to base64
         audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
         
         # Log call
-        call_integration.log_call(text, quality_score, meets_target)
+        call_integration.log_call(text, quality_score, meets_target, language, latency_ms)
         
         # Response
         response = {
@@ -154,6 +349,8 @@ def generate_business_voice():
             'audio_base64': audio_base64,
             'format': audio_format,
             'language': language,
+            'prosody': prosody,
+            'acoustic': acoustic,
             'message': 'Voice generated successfully for business call'
         }
         
@@ -163,9 +360,12 @@ def generate_business_voice():
         logger.info(f"Voice generated successfully: {quality_score:.1%} quality")
         return jsonify(response)
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"Voice generation error: {str(e)}")
-        call_integration.log_call(text if 'text' in locals() else '', 0.0, False)
+        call_integration.log_call(text if 'text' in locals() else '', 0.0, False,
+                                  language if 'language' in locals() else 'english')
         return jsonify({
             'success': False,
             'error': f'Internal server error: {str(e)}'
@@ -188,21 +388,42 @@ def generate_business_voice_file():
         if not text:
             return jsonify({'error': 'Text is required'}), 400
         
+        if len(text) > MAX_TEXT_LENGTH:
+            return jsonify({'error': f'Text too long (max {MAX_TEXT_LENGTH} characters)'}), 400
+        
         language = data.get('language', 'english')
+        priority = data.get('priority', 'interactive')
+        
+        if priority not in PRIORITY_CLASSES:
+            return jsonify({'error': f'Unknown priority (use one of {", ".join(PRIORITY_CLASSES)})'}), 400
+        
+        prosody = variant_params(data)
+        prosody_error = validate_params(**prosody)
+        if prosody_error:
+            return jsonify({'error': prosody_error}), 400
+        
+        forwarded = cluster.forward(request, request_key(text, language))
+        if forwarded is not None:
+            return forwarded
         
         # Generate voice
-        audio_bytes, quality_score = voice_cloner.generate_voice(text, language)
+        with admission.admit(client_key_from_request(request, cluster.is_peer_forwarded(request)), len(text), priority):
+            started = time.perf_counter()
+            audio_bytes, quality_score = synthesize_variant(text, language, priority, **prosody)
+            latency_ms = (time.perf_counter() - started) * 1000
         
         if not audio_bytes:
             return jsonify({'error': 'Voice generation failed'}), 500
         
+        quality_score = assess(audio_bytes, text, prosody['rate'])['score']
+        
         # Create temporary file
         with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
             tmp_file.write(audio_bytes)
             tmp_file_path = tmp_file.name
         
         # Log call
-        call_integration.log_call(text, quality_score, True)
+        call_integration.log_call(text, quality_score, True, language, latency_ms)
         
         # Return file
         return send_file(
@@ -212,35 +433,246 @@ def generate_business_voice_file():
             download_name=f'business_voice_{int(time.time())}.wav'
         )
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"File generation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@sock.route('/ws/business-voice')
+def stream_business_voice(ws):
+    """
+    Incremental voice generation over WebSocket
+    
+    Client messages (JSON text frames):
+    {"type": "start", "language": "english", "priority": "interactive"}  # optional, first
+    {"type": "text", "text": "Hello, this is regard"}  # any number, any split
+    {"type": "flush"}   # end of a dialog turn: synthesize the trailing partial phrase
+    {"type": "cancel"}  # barge-in: drop buffered text and undelivered audio
+    {"type": "end"}     # flush, deliver remaining audio and close
+    
+    Server messages: {"type": "audio", "seq", "text", "quality_score", "format"} followed
+    by one binary frame of WAV audio per phrase; {"type": "error", ...};
+    {"type": "cancelled", "dropped": n}; {"type": "done", "phrases": n}
+    """
+    client_key = client_key_from_request(request, cluster.is_peer_forwarded(request))
+    send_lock = threading.Lock()
+    options = {'language': 'english', 'priority': 'interactive'}
+    
+    def send_json(message):
+        with send_lock:
+            ws.send(json.dumps(message))
+    
+    def synthesize_phrase(phrase):
+        with admission.admit(client_key, len(phrase), options['priority']):
+            started = time.perf_counter()
+            audio_bytes, quality_score = synthesize(phrase, options['language'], options['priority'])
+            latency_ms = (time.perf_counter() - started) * 1000
+        if audio_bytes:
+            quality_score = assess(audio_bytes, phrase)['score']
+        call_integration.log_call(phrase, quality_score, audio_bytes is not None, options['language'], latency_ms)
+        return audio_bytes, quality_score
+    
+    def on_audio(seq, phrase, audio_bytes, quality_score):
+        with send_lock:
+            ws.send(json.dumps({
+                'type': 'audio',
+                'seq': seq,
+                'text': phrase,
+                'quality_score': round(quality_score, 3),
+                'format': 'wav'
+            }))
+            ws.send(audio_bytes)
+    
+    def on_error(seq, phrase, error):
+        send_json({'type': 'error', 'seq': seq, 'text': phrase, 'error': error})
+    
+    session = StreamingSession(synthesize_phrase, on_audio, on_error)
+    try:
+        while True:
+            raw = ws.receive()
+            if raw is None:
+                break
+            try:
+                message = json.loads(raw)
+            except (TypeError, ValueError):
+                send_json({'type': 'error', 'error': 'Messages must be JSON text frames'})
+                continue
+            
+            kind = message.get('type')
+            if kind == 'start':
+                language = message.get('language', options['language'])
+                priority = message.get('priority', options['priority'])
+                if priority not in PRIORITY_CLASSES:
+                    send_json({'type': 'error', 'error': f'Unknown priority: {priority}'})
+                    continue
+                options.update(language=language, priority=priority)
+            elif kind == 'text':
+                session.push_text(str(message.get('text', '')))
+            elif kind == 'flush':
+                session.flush()
+            elif kind == 'cancel':
+                send_json({'type': 'cancelled', 'dropped': session.cancel()})
+            elif kind == 'end':
+                session.flush()
+                session.close(wait=True)
+                send_json({'type': 'done', 'phrases': session.sent})
+                break
+            else:
+                send_json({'type': 'error', 'error': f'Unknown message type: {kind}'})
+    finally:
+        session.close(wait=False)
+
+@app.route('/api/business-voice/rtp', methods=['POST'])
+def stream_business_voice_rtp():
+    """
+    Stream synthesized speech as paced 20 ms G.711 RTP packets to a media gateway
+    
+    Request:
+    {
+        "text": "Hello, this is regarding your account update.",
+        "host": "10.0.0.5",  # must be in RTP_ALLOWED_HOSTS
+        "port": 40000,
+        "payload": "pcmu",  # optional: pcmu (PT 0), pcma (PT 8)
+        "language": "english",  # optional
+        "priority": "interactive"  # optional
+    }
+    
+    The whole text passes admission control first (429/503 as for other
+    endpoints), then 202 returns as soon as the stream is set up; the first packet
+    goes out when the first phrase is synthesized.
+    POST /api/business-voice/rtp/<ssrc>/stop ends the stream early (barge-in)
+    from any worker process.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'success': False, 'error': 'JSON request required'}), 400
+    
+    text = str(data.get('text', '')).strip()
+    host = data.get('host')
+    port = data.get('port')
+    payload = data.get('payload', 'pcmu')
+    language = data.get('language', 'english')
+    priority = data.get('priority', 'interactive')
+    
+    if not text:
+        return jsonify({'success': False, 'error': 'Text is required'}), 400
+    if len(text) > MAX_TEXT_LENGTH:
+        return jsonify({'success': False, 'error': f'Text too long (max {MAX_TEXT_LENGTH} characters)'}), 400
+    if host not in RTP_ALLOWED_HOSTS:
+        return jsonify({'success': False, 'error': 'Destination host is not an allowed media gateway'}), 403
+    if not isinstance(port, int) or not 1 <= port <= 65535:
+        return jsonify({'success': False, 'error': 'port must be an integer 1-65535'}), 400
+    if payload not in PAYLOAD_TYPES:
+        return jsonify({'success': False, 'error': f'Unknown payload (use one of {", ".join(PAYLOAD_TYPES)})'}), 400
+    if priority not in PRIORITY_CLASSES:
+        return jsonify({'success': False, 'error': f'Unknown priority (use one of {", ".join(PRIORITY_CLASSES)})'}), 400
+    
+    # Admit the whole prompt before answering 202, so a shed client hears about it
+    client_key = client_key_from_request(request, cluster.is_peer_forwarded(request))
+    with ExitStack() as stack:
+        stack.enter_context(admission.admit(client_key, len(text), priority))
+        with rtp_lock:
+            if len(rtp_streams) >= MAX_RTP_STREAMS:
+                admission.refund(client_key, len(text))
+                return jsonify({'success': False, 'error': 'Too many active RTP streams'}), 503
+            streamer = RTPStreamer(host, port, payload, buffer_seconds=RTP_BUFFER_SECONDS)
+            rtp_stop_relay.register(streamer.ssrc)
+            rtp_streams[streamer.ssrc] = streamer
+            rtp_totals['started'] += 1
+        # Handed to the stream thread, which releases it once synthesis is done
+        admitted = stack.pop_all()
+    
+    failed = threading.Event()
+    
+    def synthesize_phrase(phrase):
+        started = time.perf_counter()
+        audio_bytes, quality_score = synthesize(phrase, language, priority)
+        latency_ms = (time.perf_counter() - started) * 1000
+        if audio_bytes:
+            quality_score = assess(audio_bytes, phrase)['score']
+        call_integration.log_call(phrase, quality_score, audio_bytes is not None, language, latency_ms)
+        return audio_bytes, quality_score
+    
+    def on_error(seq, phrase, error):
+        # A gap in the middle of a prompt is worse than stopping
+        logger.error(f"RTP stream {streamer.ssrc}: phrase {seq} failed: {error}")
+        failed.set()
+        streamer.stop()
+    
+    def on_audio(seq, phrase, audio_bytes, quality_score):
+        # Feeding blocks while the ring is full; a closed ring means the stream was stopped
+        if not streamer.feed(audio_bytes):
+            session.cancel()
+    
+    session = StreamingSession(synthesize_phrase, on_audio, on_error)
+    
+    def run():
+        try:
+            try:
+                session.push_text(text)
+                session.flush()
+                session.close(wait=True)
+            finally:
+                # The slot covers synthesis and buffering, not the real-time playout tail
+                admitted.close()
+        finally:
+            streamer.finish()
+            streamer.wait()
+            rtp_stop_relay.unregister(streamer.ssrc)
+            with rtp_lock:
+                rtp_streams.pop(streamer.ssrc, None)
+                outcome = 'failed' if failed.is_set() else 'stopped' if streamer.stats.get('stopped') else 'completed'
+                rtp_totals[outcome] += 1
+            logger.info(f"RTP stream {streamer.ssrc} {outcome}: {streamer.get_stats()}")
+    
+    streamer.start()
+    threading.Thread(target=run, name=f'rtp-{streamer.ssrc}', daemon=True).start()
+    return jsonify({
+        'success': True,
+        'ssrc': streamer.ssrc,
+        'destination': f'{host}:{port}',
+        'payload': payload,
+        'payload_type': PAYLOAD_TYPES[payload],
+        'clock_rate': RTP_CLOCK_RATE,
+        'ptime_ms': RTP_PTIME_MS
+    }), 202
+
+@app.route('/api/business-voice/rtp/<int:ssrc>/stop', methods=['POST'])
+def stop_business_voice_rtp(ssrc):
+    """
+    Stop an RTP stream immediately, dropping undelivered audio
+    Streams owned by another worker process are stopped through the relay (202, no stats)
+    """
+    streamer = stop_local_rtp_stream(ssrc)
+    if streamer is not None:
+        return jsonify({'success': True, 'ssrc': ssrc, 'stats': streamer.get_stats()})
+    owner_pid = rtp_stop_relay.send_stop(ssrc)
+    if owner_pid is None:
+        return jsonify({'success': False, 'error': 'Unknown or finished stream'}), 404
+    return jsonify({'success': True, 'ssrc': ssrc, 'worker_pid': owner_pid}), 202
+
 @app.route('/api/demo-phrases', methods=['GET'])
 def get_demo_phrases():
-    """Get pre-built business demo phrases"""
-    demo_phrases = {
-        "account_updates": [
-            "Hello, this is regarding your account update.",
-            "Your account has been successfully verified and is now active.",
-            "We have processed your recent transaction and updated your balance."
-        ],
-        "service_notifications": [
-            "Thank you for choosing our company for your business needs.",
-            "We have an important service update to share with you today.", 
-            "Your service request has been completed successfully."
-        ],
-        "follow_up_calls": [
-            "I'm calling to follow up on our previous conversation.",
-            "We wanted to ensure you're satisfied with our recent service.",
-            "Is there anything else we can help you with today?"
-        ],
-        "professional_greetings": [
-            "Good morning, thank you for taking the time to speak with us.",
-            "We appreciate your business and continued partnership.",
-            "This is a courtesy call to update you on your service status."
-        ]
-    }
+    """
+    Get pre-built business demo phrases
+    With ?audio=true each phrase comes with its pre-rendered audio reference:
+    {"text", "ready", "audio_url"} - audio_url is set once the phrase is cached
+    """
+    include_audio = request.args.get('audio', '').lower() in ('1', 'true', 'yes')
+    entries = prewarmer.catalog_entries()
+    
+    if include_audio:
+        demo_phrases = {
+            category: [{
+                'text': entry['text'],
+                'ready': entry['ready'],
+                'audio_url': f"/api/prerendered/{entry['key']}" if entry['ready'] else None
+            } for entry in phrases]
+            for category, phrases in entries.items()
+        }
+    else:
+        demo_phrases = {category: [entry['text'] for entry in phrases] for category, phrases in entries.items()}
     
     return jsonify({
         'success': True,
@@ -249,19 +681,62 @@ def get_demo_phrases():
         'total_phrases': sum(len(phrases) for phrases in demo_phrases.values())
     })
 
+@app.route('/api/prerendered/<key>', methods=['GET'])
+def get_prerendered_audio(key):
+    """
+    Pre-rendered or cached audio by cache key (as referenced from /api/demo-phrases)
+    Served from the host-wide pre-render store, so any worker can answer; lookups
+    do not count toward the synthesis cache hit rate
+    """
+    cached = synthesis_cache.peek(key) or prerender_store.get(key)
+    if cached is None:
+        return jsonify({'success': False, 'error': 'Audio not rendered or evicted'}), 404
+    return send_file(io.BytesIO(cached[0]), mimetype='audio/wav',
+                     download_name=f'{key}.wav')
+
 @app.route('/api/stats', methods=['GET'])
 def get_system_stats():
-    """Get system statistics and performance metrics"""
+    """
+    Get system statistics and performance metrics
+    Optional query: since/until as epoch seconds or ISO 8601 (hour granularity),
+    defaults to the last 24 hours
+    """
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'since/until must be epoch seconds or ISO 8601'}), 400
+    if since is None:
+        since = time.time() - 24 * 3600
+    
+    store = call_integration.store
     return jsonify({
         'success': True,
         'model_info': {
             'name': 'snorTTS-Indic-v0',
             'quality_target': '80%',
             'languages': ['english', 'hindi', 'mixed'],
-            'stealth_mode': 'active'
+            'stealth_mode': 'active',
+            'inference_mode': getattr(voice_cloner, 'inference_mode', 'fp32'),
+            'autotune': tuned_config
         },
         'performance_stats': call_integration.quality_stats,
-        'recent_calls': call_integration.call_history[-10:] if call_integration.call_history else []
+        'host_calls': call_integration.shared.snapshot(),
+        'worker_pid': os.getpid(),
+        'acoustic_quality': acoustic_stats.get_stats(),
+        'rtp': dict(rtp_totals, active=len(rtp_streams)),
+        'admission': admission.get_stats(),
+        'cache': synthesis_cache.get_stats(),
+        'cluster': cluster.get_stats(),
+        'scheduler': synthesis_scheduler.get_stats(),
+        'batching': voice_cloner.batch_scheduler.get_stats() if getattr(voice_cloner, 'batch_scheduler', None) else None,
+        'call_log': {
+            'since': since,
+            'until': until,
+            'summary': store.summary(since, until),
+            'by_language_hour': store.breakdown(since, until)
+        } if store else None,
+        'recent_calls': call_integration.shared.recent(10)
     })
 
 @app.route('/api/test-phrases', methods=['POST'])
@@ -273,7 +748,8 @@ def test_call_quality():
     {
         "phrases": ["Hello, this is...", "Thank you for..."],
         "language": "english",
-        "quality_target": 0.80
+        "quality_target": 0.80,
+        "priority": "bulk"  # optional: interactive, standard, bulk
     }
     """
     try:
@@ -281,27 +757,55 @@ def test_call_quality():
         phrases = data.get('phrases', [])
         language = data.get('language', 'english')
         quality_target = data.get('quality_target', 0.80)
+        priority = data.get('priority', 'bulk')
         
         if not phrases:
             return jsonify({'error': 'Phrases list is required'}), 400
         
+        if not isinstance(phrases, list):
+            return jsonify({'error': 'Phrases must be a list of strings'}), 400
+        
+        if len(phrases) > MAX_TEST_PHRASES:
+            return jsonify({'error': f'Too many phrases (max {MAX_TEST_PHRASES})'}), 400
+        
+        if any(not isinstance(p, str) or len(p) > MAX_TEXT_LENGTH for p in phrases):
+            return jsonify({'error': f'Each phrase must be text of at most {MAX_TEXT_LENGTH} characters'}), 400
+        
+        if priority not in PRIORITY_CLASSES:
+            return jsonify({'error': f'Unknown priority (use one of {", ".join(PRIORITY_CLASSES)})'}), 400
+        
         results = []
         total_quality = 0
         
-        for phrase in phrases:
-            audio_bytes, quality_score = voice_cloner.generate_voice(phrase, language)
+        # Whole batch is charged up front so it is shed before any synthesis; each phrase
+        # then takes its own in-flight slot, so a batch never holds one for all its phrases
+        client_key = client_key_from_request(request, cluster.is_peer_forwarded(request))
+        admission.charge(client_key, sum(len(p) for p in phrases))
+        for index, phrase in enumerate(phrases):
+            try:
+                with admission.slot(priority):
+                    started = time.perf_counter()
+                    audio_bytes, quality_score = synthesize(phrase, language, priority)
+                    latency_ms = (time.perf_counter() - started) * 1000
+            except AdmissionRejected:
+                admission.refund(client_key, sum(len(p) for p in phrases[index:]))
+                raise
+            acoustic = assess(audio_bytes, phrase) if audio_bytes else None
+            if acoustic:
+                quality_score = acoustic['score']
             
             result = {
                 'phrase': phrase[:100] + '...' if len(phrase) > 100 else phrase,
                 'quality_score': round(quality_score, 3),
                 'meets_target': quality_score >= quality_target,
-                'success': audio_bytes is not None
+                'success': audio_bytes is not None,
+                'issues': acoustic['issues'] if acoustic else None
             }
             
             results.append(result)
             if audio_bytes:
                 total_quality += quality_score
-                call_integration.log_call(phrase, quality_score, True)
+                call_integration.log_call(phrase, quality_score, True, language, latency_ms)
         
         avg_quality = total_quality / len([r for r in results if r['success']]) if results else 0
         
@@ -316,11 +820,25 @@ def test_call_quality():
             }
         })
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"Batch testing error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 # Error handlers
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(error):
+    logger.warning(f"Request shed ({error.status_code}): {error.reason}")
+    response = jsonify({
+        'success': False,
+        'error': error.reason
+    })
+    response.status_code = error.status_code
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(max(1, int(error.retry_after + 0.999)))
+    return response
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -330,9 +848,12 @@ def not_found(error):
             '/health',
             '/api/business-voice',
             '/api/business-voice/file', 
+            '/api/business-voice/rtp',
             '/api/demo-phrases',
+            '/api/prerendered/<key>',
             '/api/stats',
-            '/api/test-phrases'
+            '/api/test-phrases',
+            '/ws/business-voice'
         ]
     }), 404
 
@@ -345,7 +866,8 @@ def internal_error(error):
 
 if __name__ == '__main__':
     # Development server
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=True, host='0.0.0.0', port=int(os.getenv('API_PORT', 5000)))
     
     # For production, use:
-    # gunicorn -w 4 -b 0.0.0.0:5000 api_integration:app
\ No newline at end of file
+    # gunicorn -c gunicorn.conf.py api_integration:app
+    # (worker count and thread limits from `python autotune.py`)
\ No newline at end of file
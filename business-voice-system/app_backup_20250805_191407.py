@@ -9,10 +9,14 @@ import time
 import logging
 import wave
 import struct
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Dict, Any
 import tempfile
 import os
 
+from batching import MicroBatchScheduler
+from quantization import get_inference_mode, load_or_quantize
+from audio_quality import analyze_wav, is_usable
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,9 +31,15 @@ class SnorTTSVoiceCloner:
     def __init__(self):
         self.model = None
         self.tokenizer = None
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.inference_mode = get_inference_mode()
+        if self.inference_mode == 'int8':
+            # Dynamic int8 kernels are CPU-only
+            self.device = torch.device("cpu")
+        else:
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.quality_threshold = 0.80
         self.is_initialized = False
+        self.batch_scheduler = None
         
     @st.cache_resource
     def load_model(_self):
@@ -40,11 +50,15 @@ class SnorTTSVoiceCloner:
             # For demo purposes, we'll simulate the snorTTS model loading
             # In production, you'd load the actual model from Hugging Face
             # tokenizer = AutoTokenizer.from_pretrained("ai4bharat/indic-tts")
-            # model = AutoModel.from_pretrained("ai4bharat/indic-tts")
+            # model = _self.load_backend_model("ai4bharat/indic-tts", lambda: AutoModel.from_pretrained("ai4bharat/indic-tts"))
             
             # Simulating model loading time
             time.sleep(2)
             
+            # Concurrent requests share batched forward passes once a real model is loaded
+            if _self.model is not None and _self.tokenizer is not None:
+                _self.start_batching()
+            
             _self.is_initialized = True
             st.success("✅ snorTTS-Indic-v0 model loaded successfully!")
             
@@ -55,52 +69,67 @@ class SnorTTSVoiceCloner:
             logger.error(f"Model loading failed: {e}")
             return False
     
-    def estimate_quality_score(self, text: str, language: str) -> float:
+    def load_backend_model(self, model_name: str, load_fp32) -> torch.nn.Module:
         """
-        Estimate voice quality score for business calls
-        Target: 80% quality for professional use
+        Load the backend model in the configured INFERENCE_MODE
+        int8 reuses the cached quantized artifact and skips the fp32 load when present
         """
-        base_score = 0.75
-        
-        # Quality factors
-        if len(text) > 10:  # Optimal length for clarity
-            base_score += 0.05
-        
-        if language == "english":  # This week's English focus
-            base_score += 0.10
-        elif language == "mixed":  # Hindi-English code switching
-            base_score += 0.05
-            
-        # Business phrase optimization
-        business_keywords = [
-            "account", "service", "update", "company", "business",
-            "professional", "client", "meeting", "call", "support",
-            "regarding", "thank", "appreciate", "follow", "courtesy"
-        ]
+        if self.inference_mode == 'int8':
+            return load_or_quantize(model_name, load_fp32)
+        return load_fp32().to(self.device).eval()
+    
+    def start_batching(self):
+        """Route model inference through the micro-batching scheduler"""
+        if self.batch_scheduler is None:
+            pad_token_id = getattr(self.tokenizer, 'pad_token_id', None) or 0
+            self.batch_scheduler = MicroBatchScheduler.from_env(self._batched_forward, pad_token_id)
+            self.batch_scheduler.start()
+    
+    def _batched_forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> list:
+        """One forward pass over a padded batch, split back into per-request rows"""
+        outputs = self.model(input_ids=input_ids.to(self.device), attention_mask=attention_mask.to(self.device))
+        if isinstance(outputs, (tuple, list)):
+            hidden = outputs[0]
+        else:
+            hidden = getattr(outputs, 'last_hidden_state', outputs)
         
-        if any(keyword in text.lower() for keyword in business_keywords):
-            base_score += 0.08
-            
-        return min(base_score, 1.0)
+        # Drop padded positions when the output is aligned with the input tokens
+        lengths = attention_mask.sum(dim=1).tolist()
+        if hidden.dim() >= 2 and hidden.shape[1] == input_ids.shape[1]:
+            return [hidden[row, :length].cpu() for row, length in enumerate(lengths)]
+        return [hidden[row].cpu() for row in range(hidden.shape[0])]
+    
+    def run_inference(self, text: str) -> torch.Tensor:
+        """Run the loaded model for one text, batched with concurrent callers"""
+        token_ids = self.tokenizer(text)['input_ids']
+        if self.batch_scheduler is None:
+            self.start_batching()
+        return self.batch_scheduler.infer(token_ids)
+    
+    def acoustic_report(self, audio_bytes: bytes, text: str, rate: float = 1.0) -> Dict[str, Any]:
+        """
+        Quality report measured on the rendered audio (clipping, silence, level,
+        SNR, spectral flatness, duration vs expected) - see audio_quality.py
+        """
+        expected_duration = max(len(text) * 0.08, 1.5) / rate
+        return analyze_wav(audio_bytes, expected_duration)
     
-    def generate_voice_wave_method(self, text: str, language: str = "english") -> Tuple[Optional[bytes], float]:
+    def generate_voice_wave_method(self, text: str, language: str = "english",
+                                   rate: float = 1.0, pitch: float = 0.0) -> Tuple[Optional[bytes], Dict[str, Any]]:
         """
         FIXED: Generate voice using Python wave module (Primary method)
         Resolves torchaudio BytesIO compatibility issues
         """
         try:
-            # Estimate quality score
-            quality_score = self.estimate_quality_score(text, language)
-            
             # Audio parameters
             sample_rate = 22050
-            duration = max(len(text) * 0.08, 1.5)  # Better duration calculation
+            duration = max(len(text) * 0.08, 1.5) / rate  # Better duration calculation
             
             # Generate more realistic audio simulation
             t = np.linspace(0, duration, int(sample_rate * duration))
             
             # Create natural-sounding voice simulation with harmonics
-            fundamental_freq = 150  # Base voice frequency
+            fundamental_freq = 150 * 2 ** (pitch / 12)  # Base voice frequency, shifted by semitones
             audio = (
                 np.sin(2 * np.pi * fundamental_freq * t) * 0.4 * np.exp(-t/4) +
                 np.sin(2 * np.pi * fundamental_freq * 2 * t) * 0.2 * np.exp(-t/5) +
@@ -126,30 +155,30 @@ class SnorTTSVoiceCloner:
                 wav_file.writeframes(audio_int16.tobytes())
             
             audio_bytes = audio_buffer.getvalue()
+            report = self.acoustic_report(audio_bytes, text, rate)
             
-            logger.info(f"Generated voice (wave method) for: '{text[:50]}...' Quality: {quality_score:.2f}")
+            logger.info(f"Generated voice (wave method) for: '{text[:50]}...' Quality: {report['score']:.2f}")
             
-            return audio_bytes, quality_score
+            return audio_bytes, report
             
         except Exception as e:
             logger.error(f"Wave method failed: {e}")
             raise e
     
-    def generate_voice_tempfile_method(self, text: str, language: str = "english") -> Tuple[Optional[bytes], float]:
+    def generate_voice_tempfile_method(self, text: str, language: str = "english",
+                                       rate: float = 1.0, pitch: float = 0.0) -> Tuple[Optional[bytes], Dict[str, Any]]:
         """
         FALLBACK: Generate voice using temporary file method
-        Used if wave method fails
+        Used if wave method fails or scores below the quality threshold
         """
         try:
-            quality_score = self.estimate_quality_score(text, language)
-            
             # Generate audio
             sample_rate = 22050
-            duration = max(len(text) * 0.08, 1.5)
+            duration = max(len(text) * 0.08, 1.5) / rate
             t = np.linspace(0, duration, int(sample_rate * duration))
             
             # Simple but effective audio generation
-            audio = np.sin(2 * np.pi * 200 * t) * 0.3 * np.exp(-t/3)
+            audio = np.sin(2 * np.pi * 200 * 2 ** (pitch / 12) * t) * 0.3 * np.exp(-t/3)
             audio_tensor = torch.tensor(audio).unsqueeze(0).float()
             
             # Use temporary file
@@ -158,15 +187,17 @@ class SnorTTSVoiceCloner:
             
             try:
                 # Save using torchaudio to file
-                torchaudio.save(tmp_path, audio_tensor, sample_rate)
+                # 16-bit PCM like the primary method, so the analyzer and audio pipelines can read it
+                torchaudio.save(tmp_path, audio_tensor, sample_rate, encoding='PCM_S', bits_per_sample=16)
                 
                 # Read file back as bytes
                 with open(tmp_path, 'rb') as f:
                     audio_bytes = f.read()
+                report = self.acoustic_report(audio_bytes, text, rate)
                 
-                logger.info(f"Generated voice (tempfile method) for: '{text[:50]}...' Quality: {quality_score:.2f}")
+                logger.info(f"Generated voice (tempfile method) for: '{text[:50]}...' Quality: {report['score']:.2f}")
                 
-                return audio_bytes, quality_score
+                return audio_bytes, report
                 
             finally:
                 # Clean up temporary file
@@ -177,11 +208,13 @@ class SnorTTSVoiceCloner:
             logger.error(f"Tempfile method failed: {e}")
             raise e
 
-    def generate_voice(self, text: str, language: str = "english") -> Tuple[Optional[bytes], float]:
+    def render(self, text: str, language: str = "english",
+               rate: float = 1.0, pitch: float = 0.0) -> Tuple[Optional[bytes], Optional[Dict[str, Any]]]:
         """
-        MAIN METHOD: Generate high-quality voice for business calls
-        Uses multiple fallback methods for reliability
-        Returns: (audio_bytes, quality_score)
+        Generate voice together with its acoustic report (see audio_quality.py)
+        Takes with a hard defect (silence, clipping, noise-like output) or a score
+        below the quality threshold are routed to the fallback backend
+        Returns: (audio_bytes, report), or (None, None) when every method fails
         """
         try:
             if not self.is_initialized:
@@ -189,23 +222,47 @@ class SnorTTSVoiceCloner:
             
             # Try primary method (wave module)
             try:
-                return self.generate_voice_wave_method(text, language)
+                audio_bytes, report = self.generate_voice_wave_method(text, language, rate, pitch)
+                if is_usable(report) and report['score'] >= self.quality_threshold:
+                    return audio_bytes, report
+                
+                # Measured quality too low: route to the fallback backend, keep the better take
+                logger.warning(f"Primary method scored {report['score']:.2f} "
+                               f"(issues: {', '.join(report['issues']) or 'none'}), trying fallback")
+                try:
+                    fallback = self.generate_voice_tempfile_method(text, language, rate, pitch)
+                except Exception as e:
+                    logger.warning(f"Fallback method failed: {e}")
+                    return audio_bytes, report
+                # A usable take beats one with a hard defect, whatever their scores
+                return max((audio_bytes, report), fallback, key=lambda take: (is_usable(take[1]), take[1]['score']))
             except Exception as e:
                 logger.warning(f"Primary method failed, trying fallback: {e}")
                 st.warning("🔄 Trying alternative audio generation method...")
                 
                 # Try fallback method (temporary file)
                 try:
-                    return self.generate_voice_tempfile_method(text, language)
+                    return self.generate_voice_tempfile_method(text, language, rate, pitch)
                 except Exception as e2:
                     logger.error(f"All methods failed: {e2}")
                     st.error(f"❌ Audio generation failed: {str(e2)}")
-                    return None, 0.0
+                    return None, None
             
         except Exception as e:
             logger.error(f"Voice generation completely failed: {e}")
             st.error(f"❌ Voice generation failed: {str(e)}")
-            return None, 0.0
+            return None, None
+
+    def generate_voice(self, text: str, language: str = "english",
+                       rate: float = 1.0, pitch: float = 0.0) -> Tuple[Optional[bytes], float]:
+        """
+        MAIN METHOD: Generate high-quality voice for business calls
+        Uses multiple fallback methods for reliability
+        rate: speaking-rate multiplier, pitch: shift in semitones
+        Returns: (audio_bytes, quality_score)
+        """
+        audio_bytes, report = self.render(text, language, rate, pitch)
+        return audio_bytes, report['score'] if report else 0.0
 
 def create_business_demo_phrases():
     """Pre-built client demo phrases for testing"""
@@ -0,0 +1,223 @@
+"""
+Acoustic Quality Analyzer for Generated Speech
+Single vectorized pass over output PCM: clipping, silence, level, SNR, spectral flatness, duration
+
+Usage:
+    python audio_quality.py --seconds 60   # benchmark analyzer cost per audio-second
+"""
+
+import math
+import time
+import argparse
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from audio_utils import decode_wav
+
+FRAME_SECONDS = 0.02
+CLIP_LEVEL = 0.999           # |sample| at or above counts as clipped (int16 full scale)
+SILENCE_DBFS = -50.0         # frames quieter than this are silence
+QUIET_RMS_DBFS = -35.0
+MIN_SNR_DB = 15.0
+MAX_SPEECH_FLATNESS = 0.5    # speech is tonal; near 1.0 means noise-like
+DURATION_RATIO_RANGE = (0.5, 2.0)
+
+# Defects that make a rendering unusable rather than just weaker
+HARD_ISSUES = frozenset(['silent', 'clipping', 'mostly_silent', 'noise_like'])
+
+
+def _dbfs(power: float) -> float:
+    return round(10 * math.log10(power), 2) if power > 1e-12 else -120.0
+
+
+def analyze(samples: np.ndarray, sample_rate: int, expected_duration: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Objective metrics plus a 0-1 score and issue list for float PCM in [-1, 1]
+    Everything is derived from one framing of the signal; SNR and spectral flatness
+    share a single batched FFT over the non-silent frames
+    """
+    duration = len(samples) / sample_rate
+    report: Dict[str, Any] = {'duration_s': round(duration, 3)}
+    if expected_duration:
+        report['expected_duration_s'] = round(expected_duration, 3)
+        report['duration_ratio'] = round(duration / expected_duration, 3)
+
+    magnitude = np.abs(samples)
+    peak = float(magnitude.max()) if len(samples) else 0.0
+    if peak < 1e-3:
+        report.update({'score': 0.0, 'issues': ['silent'], 'peak_dbfs': _dbfs(peak * peak)})
+        return report
+
+    frame_length = min(len(samples), max(1, int(sample_rate * FRAME_SECONDS)))
+    frame_count = len(samples) // frame_length
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+    energy = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+
+    voiced = energy > 10 ** (SILENCE_DBFS / 10)
+
+    flatness = 0.0
+    snr_db = 0.0
+    if voiced.any():
+        spectrum = np.abs(np.fft.rfft(frames[voiced] * np.hanning(frames.shape[1]), axis=1)) ** 2 + 1e-12
+        band_power = spectrum.mean(axis=1)
+        flatness = float(np.mean(np.exp(np.log(spectrum).mean(axis=1)) / band_power))
+        # Speech energy sits in a few harmonics; the lower quartile of bins is the noise floor
+        noise_power = np.percentile(spectrum, 25, axis=1)
+        snr_db = 10 * math.log10(float(band_power.sum()) / float(noise_power.sum()))
+
+    report.update({
+        'clipping_ratio': round(float(np.count_nonzero(magnitude >= CLIP_LEVEL)) / len(samples), 5),
+        'silence_ratio': round(1.0 - float(np.count_nonzero(voiced)) / frame_count, 4),
+        'rms_dbfs': _dbfs(float(energy.mean())),
+        'peak_dbfs': _dbfs(peak * peak),
+        'snr_db': round(snr_db, 2),
+        'spectral_flatness': round(flatness, 4)
+    })
+    report['score'], report['issues'] = score(report)
+    return report
+
+
+def score(metrics: Dict[str, Any]):
+    """Combine metrics into a 0-1 quality score and a list of detected issues"""
+    issues: List[str] = []
+    penalty = 0.0
+
+    clipping = metrics['clipping_ratio']
+    if clipping > 0.001:
+        penalty += min(0.5, clipping * 30)
+        if clipping > 0.01:
+            issues.append('clipping')
+
+    silence = metrics['silence_ratio']
+    if silence > 0.5:
+        penalty += (silence - 0.5) * 0.8
+        if silence > 0.8:
+            issues.append('mostly_silent')
+
+    if metrics['rms_dbfs'] < QUIET_RMS_DBFS:
+        penalty += 0.1
+        issues.append('too_quiet')
+
+    if metrics['snr_db'] < MIN_SNR_DB:
+        penalty += min(0.3, (MIN_SNR_DB - metrics['snr_db']) * 0.02)
+        issues.append('noisy')
+
+    if metrics['spectral_flatness'] > MAX_SPEECH_FLATNESS:
+        penalty += 0.3
+        issues.append('noise_like')
+
+    ratio = metrics.get('duration_ratio')
+    if ratio is not None:
+        low, high = DURATION_RATIO_RANGE
+        if not low <= ratio <= high:
+            penalty += min(0.3, abs(math.log2(ratio)) * 0.2)
+            issues.append('duration_mismatch')
+
+    return round(max(0.0, 1.0 - penalty), 3), issues
+
+
+def analyze_wav(audio_bytes: bytes, expected_duration: Optional[float] = None) -> Dict[str, Any]:
+    """analyze() on 16-bit PCM WAV bytes"""
+    samples, sample_rate = decode_wav(audio_bytes)
+    return analyze(samples, sample_rate, expected_duration)
+
+
+def is_usable(report: Dict[str, Any]) -> bool:
+    return not HARD_ISSUES.intersection(report['issues'])
+
+
+class ReportCache:
+    """
+    Recent reports keyed by the exact audio bytes they describe
+    Lets the API reuse the engine's analysis instead of running it again
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._reports: 'OrderedDict[bytes, Dict[str, Any]]' = OrderedDict()
+
+    def put(self, audio_bytes: bytes, report: Dict[str, Any]):
+        with self._lock:
+            self._reports[audio_bytes] = report
+            self._reports.move_to_end(audio_bytes)
+            while len(self._reports) > self.max_entries:
+                self._reports.popitem(last=False)
+
+    def get(self, audio_bytes: bytes, expected_duration: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Report for these bytes, if it was made against the same expected duration"""
+        with self._lock:
+            report = self._reports.get(audio_bytes)
+        if report is None or report.get('expected_duration_s') != (
+                round(expected_duration, 3) if expected_duration else None):
+            return None
+        return report
+
+
+class QualityStats:
+    """Running acoustic metric averages and issue counts across requests"""
+
+    METRICS = ('score', 'clipping_ratio', 'silence_ratio', 'rms_dbfs', 'snr_db', 'spectral_flatness', 'duration_ratio')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+        self._sums = {name: 0.0 for name in self.METRICS}
+        self._samples = {name: 0 for name in self.METRICS}
+        self._issues: Counter = Counter()
+        self._analysis_seconds = 0.0
+        self._audio_seconds = 0.0
+
+    def record(self, report: Dict[str, Any], elapsed: Optional[float] = None):
+        """elapsed: analysis time, or None for a reused report (left out of the cost figure)"""
+        with self._lock:
+            self._count += 1
+            for name in self.METRICS:
+                if name in report:
+                    self._sums[name] += report[name]
+                    self._samples[name] += 1
+            self._issues.update(report['issues'])
+            if elapsed is not None:
+                self._analysis_seconds += elapsed
+                self._audio_seconds += report['duration_s']
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'analyzed': self._count,
+                'averages': {name: round(self._sums[name] / self._samples[name], 4)
+                             for name in self.METRICS if self._samples[name]},
+                'issues': dict(self._issues),
+                'analysis_us_per_audio_s': round(self._analysis_seconds / self._audio_seconds * 1e6, 1)
+                if self._audio_seconds else None
+            }
+
+
+def benchmark(seconds: float = 60.0, sample_rate: int = 22050, repeats: int = 20) -> Dict[str, Any]:
+    """Analyzer cost on synthetic voiced audio, per audio-second"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = (0.3 * np.sin(2 * np.pi * 150 * t) + 0.1 * np.sin(2 * np.pi * 450 * t)
+               + np.random.normal(0, 0.01, len(t))).astype(np.float32)
+    analyze(samples, sample_rate, seconds)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        analyze(samples, sample_rate, seconds)
+    elapsed = (time.perf_counter() - started) / repeats
+    return {
+        'audio_seconds': seconds,
+        'sample_rate': sample_rate,
+        'ms_per_call': round(elapsed * 1000, 3),
+        'us_per_audio_second': round(elapsed / seconds * 1e6, 1)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the acoustic quality analyzer')
+    parser.add_argument('--seconds', type=float, default=60.0, help='Length of the benchmark signal')
+    parser.add_argument('--sample-rate', type=int, default=22050)
+    args = parser.parse_args()
+    for length in (2.0, args.seconds):
+        print(benchmark(length, args.sample_rate))
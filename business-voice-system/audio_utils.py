@@ -0,0 +1,62 @@
+"""
+Audio Utilities for Business Voice System
+WAV <-> float PCM conversion shared by the audio pipelines
+"""
+
+import io
+import wave
+from typing import List, Tuple
+
+import numpy as np
+
+
+def decode_wav(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+    """Decode 16-bit PCM WAV bytes to mono float32 samples in [-1, 1]"""
+    with wave.open(io.BytesIO(audio_bytes), 'rb') as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        sample_rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+
+    if sample_width != 2:
+        raise ValueError(f'Unsupported sample width: {sample_width * 8} bits')
+
+    samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode float samples in [-1, 1] as mono 16-bit PCM WAV bytes"""
+    audio_int16 = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    audio_buffer = io.BytesIO()
+    with wave.open(audio_buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(audio_int16.tobytes())
+    return audio_buffer.getvalue()
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Linear-interpolation resample; adequate for joining speech segments"""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    target_length = int(round(len(samples) * target_rate / source_rate))
+    positions = np.linspace(0, len(samples) - 1, target_length)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def concat_wav(parts: List[bytes], gap_seconds: float = 0.0) -> bytes:
+    """Join WAV renderings in order at the first part's sample rate"""
+    decoded = [decode_wav(part) for part in parts]
+    sample_rate = decoded[0][1]
+    gap = np.zeros(int(sample_rate * gap_seconds), dtype=np.float32)
+
+    pieces = []
+    for index, (samples, rate) in enumerate(decoded):
+        if index and len(gap):
+            pieces.append(gap)
+        pieces.append(resample(samples, rate, sample_rate))
+    return encode_wav(np.concatenate(pieces), sample_rate)
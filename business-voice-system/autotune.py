@@ -0,0 +1,263 @@
+"""
+CPU Topology-Aware Worker and Thread Autotuner
+Benchmarks worker count x intra-op threads x executor size and applies the result per worker
+
+Usage:
+    python autotune.py --duration 10 --output autotune.json
+    AUTOTUNE_CONFIG=autotune.json AUTOTUNE_PROFILE=latency gunicorn -c gunicorn.conf.py api_integration:app
+
+Only stdlib imports at module level: thread limits must be in the environment
+before NumPy/torch load their thread pools.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import queue
+import argparse
+import itertools
+import logging
+import multiprocessing
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                   'NUMEXPR_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS')
+
+BENCHMARK_PHRASES = [
+    "Hello, this is regarding your account update.",
+    "Your account has been successfully verified and is now active.",
+    "We have processed your recent transaction and updated your balance.",
+    "I'm calling to follow up on our previous conversation.",
+    "This is a courtesy call to update you on your service status."
+]
+
+
+def detect_topology() -> Dict[str, Any]:
+    """Usable logical CPUs plus physical cores and sockets from sysfs when available"""
+    try:
+        usable = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        usable = list(range(os.cpu_count() or 1))
+
+    cores = set()
+    sockets = set()
+    for cpu in usable:
+        base = f'/sys/devices/system/cpu/cpu{cpu}/topology'
+        try:
+            with open(f'{base}/core_id') as f:
+                core_id = f.read().strip()
+            with open(f'{base}/physical_package_id') as f:
+                package_id = f.read().strip()
+        except OSError:
+            continue
+        cores.add((package_id, core_id))
+        sockets.add(package_id)
+
+    physical = len(cores) or len(usable)
+    return {
+        'logical_cpus': len(usable),
+        'physical_cores': physical,
+        'sockets': len(sockets) or 1,
+        'smt': len(usable) > physical,
+        'numa_nodes': len(glob.glob('/sys/devices/system/node/node[0-9]*')) or 1
+    }
+
+
+def apply_thread_limits(config: Dict[str, Any]):
+    """
+    Cap BLAS/OpenMP/torch thread pools for this worker
+    Environment variables only take effect if set before NumPy/torch import;
+    torch is also adjusted directly when already loaded
+    """
+    threads = str(int(config['intra_op_threads']))
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = threads
+    if config.get('executor_size'):
+        os.environ.setdefault('SYNTH_WORKERS', str(int(config['executor_size'])))
+
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(int(threads))
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Only allowed before the first parallel op
+            pass
+
+
+def load_tuned_config(path: Optional[str] = None, profile: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Recommended configuration for AUTOTUNE_PROFILE from AUTOTUNE_CONFIG, if present"""
+    path = path or os.getenv('AUTOTUNE_CONFIG', 'autotune.json')
+    profile = profile or os.getenv('AUTOTUNE_PROFILE', 'latency')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        report = json.load(f)
+    return report['recommended'].get(profile)
+
+
+def apply_tuned_config() -> Optional[Dict[str, Any]]:
+    """Apply the tuned thread limits at startup; returns the config applied"""
+    try:
+        config = load_tuned_config()
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable autotune config: {e}")
+        return None
+    if config:
+        apply_thread_limits(config)
+    return config
+
+
+def _benchmark_worker(config: Dict[str, Any], duration: float, start_at: float, results):
+    apply_thread_limits(config)
+
+    import threading
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    # The synthesis engine is defined in the backup module; app.py holds only the Streamlit UI
+    from app_backup_20250805_191407 import SnorTTSVoiceCloner
+
+    cloner = SnorTTSVoiceCloner()
+    cloner.load_model()
+    cloner.generate_voice(BENCHMARK_PHRASES[0], 'english')  # warm-up
+
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def loop(offset: int):
+        index = offset
+        while time.time() < start_at + duration:
+            phrase = BENCHMARK_PHRASES[index % len(BENCHMARK_PHRASES)]
+            started = time.perf_counter()
+            cloner.generate_voice(phrase, 'english')
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+            index += 1
+
+    # Line workers up so all processes measure the same window
+    time.sleep(max(0.0, start_at - time.time()))
+    threads = [threading.Thread(target=loop, args=(i,)) for i in range(config['executor_size'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(latencies)
+
+
+def benchmark_config(config: Dict[str, Any], duration: float) -> Dict[str, Any]:
+    """Run `workers` spawned processes under the config and measure the synthesis path"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    # Leave time for spawn + model load before the shared measurement window opens
+    start_at = time.time() + 5.0
+    processes = [context.Process(target=_benchmark_worker, args=(config, duration, start_at, results))
+                 for _ in range(config['workers'])]
+    for process in processes:
+        process.start()
+    latencies = []
+    deadline = start_at + duration + 120
+    received = 0
+    while received < len(processes):
+        try:
+            latencies.extend(results.get(timeout=1.0))
+            received += 1
+        except queue.Empty:
+            # A worker that died (import error, OOM) will never report
+            if all(not process.is_alive() for process in processes) or time.time() > deadline:
+                logger.error(f"Benchmark workers failed for {config}")
+                break
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+    latencies.sort()
+    count = len(latencies)
+    return dict(config, **{
+        'requests': count,
+        'throughput_rps': round(count / duration, 2),
+        'latency_ms_p50': round(latencies[count // 2] * 1000, 2) if count else None,
+        'latency_ms_p99': round(latencies[min(count - 1, int(count * 0.99))] * 1000, 2) if count else None
+    })
+
+
+def candidate_configs(topology: Dict[str, Any], workers: List[int], threads: List[int],
+                      executors: List[int]) -> List[Dict[str, int]]:
+    """Grid of configs whose compute threads fit the usable CPUs"""
+    cpus = topology['logical_cpus']
+    configs = []
+    for worker_count, thread_count, executor_size in itertools.product(workers, threads, executors):
+        if worker_count * thread_count * executor_size <= cpus * 2 and worker_count * thread_count <= cpus:
+            configs.append({'workers': worker_count, 'intra_op_threads': thread_count, 'executor_size': executor_size})
+    return configs
+
+
+def recommend(results: List[Dict[str, Any]], throughput_floor: float = 0.8) -> Dict[str, Dict[str, Any]]:
+    """
+    throughput: highest requests/s
+    latency: lowest p99 among configs keeping at least throughput_floor of the best throughput
+    """
+    measured = [r for r in results if r['requests']]
+    if not measured:
+        raise ValueError(f'No configuration completed a request ({len(results)} tried); '
+                         f'check the benchmark worker logs above')
+    best_throughput = max(measured, key=lambda r: r['throughput_rps'])
+    eligible = [r for r in measured if r['throughput_rps'] >= throughput_floor * best_throughput['throughput_rps']]
+    best_latency = min(eligible, key=lambda r: r['latency_ms_p99'])
+    keys = ('workers', 'intra_op_threads', 'executor_size')
+    return {
+        'throughput': {key: best_throughput[key] for key in keys},
+        'latency': {key: best_latency[key] for key in keys}
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def main():
+    topology = detect_topology()
+    cpus = topology['logical_cpus']
+    powers = [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cpus] or [1]
+
+    parser = argparse.ArgumentParser(description='Benchmark worker/thread layouts for the synthesis path')
+    parser.add_argument('--workers', type=_int_list, default=powers, help='Comma-separated worker counts')
+    parser.add_argument('--threads', type=_int_list, default=[n for n in powers if n <= 8],
+                        help='Comma-separated intra-op thread counts')
+    parser.add_argument('--executors', type=_int_list, default=[1, 2, 4], help='Comma-separated executor sizes')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per configuration')
+    parser.add_argument('--output', default='autotune.json')
+    args = parser.parse_args()
+
+    configs = candidate_configs(topology, args.workers, args.threads, args.executors)
+    logger.info(f"Topology: {topology}; benchmarking {len(configs)} configurations")
+
+    results = []
+    for config in configs:
+        result = benchmark_config(config, args.duration)
+        logger.info(f"{config}: {result['throughput_rps']} req/s, p99 {result['latency_ms_p99']} ms")
+        results.append(result)
+
+    try:
+        recommended = recommend(results)
+    except ValueError as e:
+        parser.exit(1, f'autotune: {e}\n')
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'topology': topology,
+        'duration_s': args.duration,
+        'results': results,
+        'recommended': recommended
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report['recommended'], indent=2))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,181 @@
+"""
+Dynamic Micro-Batching for snorTTS Model Inference
+Collects concurrent requests into padded, length-bucketed batches
+"""
+
+import os
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingItem:
+    __slots__ = ('token_ids', 'future', 'enqueued')
+
+    def __init__(self, token_ids: List[int]):
+        self.token_ids = token_ids
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatchScheduler:
+    """
+    Batches single-request inference calls into one forward pass
+    Waits up to max_wait_ms or max_batch_size items, buckets by token length,
+    pads each bucket and scatters per-row outputs back to the callers
+    """
+
+    def __init__(self,
+                 forward_fn: Callable[[torch.Tensor, torch.Tensor], Any],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0,
+                 bucket_width: int = 32,
+                 pad_token_id: int = 0):
+        self.forward_fn = forward_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.bucket_width = max(1, bucket_width)
+        self.pad_token_id = pad_token_id
+
+        self._queue: "queue.Queue[Optional[_PendingItem]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'batches': 0,
+            'items': 0,
+            'real_tokens': 0,
+            'padded_tokens': 0,
+            'total_wait_ms': 0.0,
+            'total_forward_ms': 0.0,
+            'batch_size_histogram': {}
+        }
+
+    @classmethod
+    def from_env(cls, forward_fn: Callable, pad_token_id: int = 0) -> 'MicroBatchScheduler':
+        """Build scheduler from environment settings"""
+        return cls(
+            forward_fn,
+            max_batch_size=int(os.getenv('BATCH_MAX_SIZE', 8)),
+            max_wait_ms=float(os.getenv('BATCH_MAX_WAIT_MS', 10)),
+            bucket_width=int(os.getenv('BATCH_BUCKET_WIDTH', 32)),
+            pad_token_id=pad_token_id
+        )
+
+    def start(self):
+        """Start the background batching thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the batching thread after draining queued work"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, token_ids: List[int]) -> Future:
+        """Queue one tokenized request; the future resolves to its output row"""
+        if not token_ids:
+            raise ValueError('token_ids must not be empty')
+        item = _PendingItem(list(token_ids))
+        self._queue.put(item)
+        return item.future
+
+    def infer(self, token_ids: List[int], timeout: Optional[float] = None) -> Any:
+        """Blocking helper: submit and wait for the result"""
+        return self.submit(token_ids).result(timeout=timeout)
+
+    def _collect(self, first: _PendingItem) -> Tuple[List[_PendingItem], bool]:
+        items = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _buckets(self, items: List[_PendingItem]) -> List[List[_PendingItem]]:
+        buckets: Dict[int, List[_PendingItem]] = {}
+        for item in items:
+            key = (len(item.token_ids) - 1) // self.bucket_width
+            buckets.setdefault(key, []).append(item)
+        return [buckets[key] for key in sorted(buckets)]
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            items, stopping = self._collect(first)
+            for bucket in self._buckets(items):
+                self._run_batch(bucket)
+
+    def _run_batch(self, items: List[_PendingItem]):
+        started = time.perf_counter()
+        lengths = [len(item.token_ids) for item in items]
+        max_len = max(lengths)
+
+        input_ids = torch.full((len(items), max_len), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(items), max_len), dtype=torch.long)
+        for row, item in enumerate(items):
+            input_ids[row, :lengths[row]] = torch.tensor(item.token_ids, dtype=torch.long)
+            attention_mask[row, :lengths[row]] = 1
+
+        try:
+            with torch.inference_mode():
+                outputs = self.forward_fn(input_ids, attention_mask)
+            for row, item in enumerate(items):
+                item.future.set_result(outputs[row])
+        except Exception as e:
+            logger.error(f"Batched forward pass failed ({len(items)} items): {e}")
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+        finished = time.perf_counter()
+        with self._stats_lock:
+            self.stats['batches'] += 1
+            self.stats['items'] += len(items)
+            self.stats['real_tokens'] += sum(lengths)
+            self.stats['padded_tokens'] += max_len * len(items)
+            self.stats['total_wait_ms'] += sum(started - item.enqueued for item in items) * 1000
+            self.stats['total_forward_ms'] += (finished - started) * 1000
+            histogram = self.stats['batch_size_histogram']
+            histogram[len(items)] = histogram.get(len(items), 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tunables plus batch size, queue wait and padding waste"""
+        with self._stats_lock:
+            batches = self.stats['batches']
+            items = self.stats['items']
+            padded = self.stats['padded_tokens']
+            return {
+                'config': {
+                    'max_batch_size': self.max_batch_size,
+                    'max_wait_ms': self.max_wait_ms,
+                    'bucket_width': self.bucket_width
+                },
+                'batches': batches,
+                'items': items,
+                'avg_batch_size': round(items / batches, 3) if batches else 0.0,
+                'padding_waste': round(1 - self.stats['real_tokens'] / padded, 4) if padded else 0.0,
+                'avg_queue_wait_ms': round(self.stats['total_wait_ms'] / items, 3) if items else 0.0,
+                'avg_forward_ms': round(self.stats['total_forward_ms'] / batches, 3) if batches else 0.0,
+                'batch_size_histogram': dict(self.stats['batch_size_histogram'])
+            }
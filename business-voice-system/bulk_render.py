@@ -0,0 +1,254 @@
+"""
+Offline Bulk Campaign Renderer
+Pre-renders personalized scripts from CSV/JSONL across a process pool
+
+Usage:
+    python bulk_render.py scripts.csv out_dir --workers 4
+    python bulk_render.py scripts.jsonl out_dir --archive campaign.tar.gz
+
+Each row needs `text`; `id` and `language` are optional. Completed rows are
+appended to out_dir/manifest.jsonl, which doubles as the resume checkpoint.
+"""
+
+import os
+import io
+import re
+import sys
+import csv
+import json
+import time
+import wave
+import hashlib
+import tarfile
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Iterator, Set
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.jsonl'
+MAX_POOL_RESTARTS = 3  # consecutive crashes with no rendered row before giving up
+
+# Per-process synthesis engine, created by the pool initializer
+_engine = None
+_mixed_renderer = None
+
+
+def read_scripts(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream script rows from a .csv or .jsonl file"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows):
+            row = dict(row)
+            row['id'] = str(row.get('id') or f'row-{index:07d}')
+            yield row
+
+
+def safe_filename(script_id: str) -> str:
+    """Readable filename for a script id; the hash suffix keeps distinct ids from colliding"""
+    digest = hashlib.sha1(script_id.encode('utf-8')).hexdigest()[:12]
+    return f"{re.sub(r'[^A-Za-z0-9._-]', '_', script_id)[:100]}-{digest}"
+
+
+def load_completed(out_dir: str) -> Set[str]:
+    """Script ids already rendered according to the manifest checkpoint"""
+    completed = set()
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn final line from an interrupted run
+                continue
+            if record.get('success'):
+                completed.add(record['id'])
+    return completed
+
+
+def _init_worker():
+    global _engine, _mixed_renderer
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    # The synthesis engine is defined in the backup module; app.py holds only the Streamlit UI
+    from app_backup_20250805_191407 import SnorTTSVoiceCloner
+    from code_switch import MixedLanguageRenderer
+
+    _engine = SnorTTSVoiceCloner()
+    _engine.load_model()
+    _mixed_renderer = MixedLanguageRenderer(_engine.generate_voice, max_workers=2)
+
+
+def _render_one(row: Dict[str, Any], audio_dir: str) -> Dict[str, Any]:
+    script_id = row['id']
+    text = (row.get('text') or '').strip()
+    language = row.get('language') or 'english'
+    record = {'id': script_id, 'language': language, 'success': False}
+    if not text:
+        record['error'] = 'empty text'
+        return record
+
+    try:
+        if language == 'mixed':
+            audio_bytes, quality_score = _mixed_renderer.render(text)
+        else:
+            audio_bytes, quality_score = _engine.generate_voice(text, language)
+    except Exception as e:
+        record['error'] = str(e)
+        return record
+    if not audio_bytes:
+        record['error'] = 'voice generation failed'
+        return record
+
+    with wave.open(io.BytesIO(audio_bytes), 'rb') as wav_file:
+        duration = wav_file.getnframes() / wav_file.getframerate()
+
+    filename = safe_filename(script_id) + '.wav'
+    path = os.path.join(audio_dir, filename)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(audio_bytes)
+    os.replace(tmp_path, path)
+
+    record.update({
+        'success': True,
+        'file': os.path.join('audio', filename),
+        'duration': round(duration, 3),
+        'quality_score': round(quality_score, 3),
+        'sha256': hashlib.sha256(audio_bytes).hexdigest(),
+        'bytes': len(audio_bytes)
+    })
+    return record
+
+
+def write_archive(out_dir: str, archive_path: str):
+    """Pack manifest and audio into a tar archive (compressed by extension)"""
+    mode = 'w:gz' if archive_path.endswith(('.tar.gz', '.tgz')) else 'w'
+    with tarfile.open(archive_path, mode) as archive:
+        archive.add(os.path.join(out_dir, MANIFEST_NAME), arcname=MANIFEST_NAME)
+        archive.add(os.path.join(out_dir, 'audio'), arcname='audio')
+
+
+def render_campaign(input_path: str, out_dir: str, workers: int = 4,
+                    max_pending: int = 0, progress_every: float = 10.0) -> Dict[str, Any]:
+    """
+    Render every script not yet in the manifest
+    At most max_pending rows are in flight, so memory stays bounded for any input size
+    """
+    audio_dir = os.path.join(out_dir, 'audio')
+    os.makedirs(audio_dir, exist_ok=True)
+    completed = load_completed(out_dir)
+    max_pending = max_pending or workers * 4
+
+    summary = {'rendered': 0, 'failed': 0, 'skipped': len(completed), 'audio_seconds': 0.0}
+    started = time.perf_counter()
+    last_report = started
+
+    pool = None
+    restarts = 0
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'a', encoding='utf-8') as manifest:
+
+        def drain(pending):
+            nonlocal last_report, pool, restarts
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                script_id = pending.pop(future)
+                try:
+                    record = future.result()
+                    restarts = 0
+                except Exception as e:
+                    # A crashed worker fails its row; the campaign carries on
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                    record = {'id': script_id, 'success': False, 'error': f'worker crashed: {e!r}'}
+                manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+                if record['success']:
+                    summary['rendered'] += 1
+                    summary['audio_seconds'] += record['duration']
+                else:
+                    summary['failed'] += 1
+                    logger.warning(f"Failed {record['id']}: {record.get('error')}")
+            manifest.flush()
+
+            if broken:
+                # Every row still queued on the dead pool fails with it
+                for future, script_id in pending.items():
+                    record = {'id': script_id, 'success': False, 'error': 'worker pool crashed'}
+                    manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    summary['failed'] += 1
+                manifest.flush()
+                pending = {}
+                pool.shutdown(wait=False, cancel_futures=True)
+                restarts += 1
+                if restarts > MAX_POOL_RESTARTS:
+                    raise RuntimeError(f'Worker pool crashed {restarts} times without rendering a row; '
+                                       f'check that the synthesis engine loads')
+                logger.warning(f"Worker pool crashed; restarting ({restarts}/{MAX_POOL_RESTARTS})")
+                pool = new_pool()
+
+            now = time.perf_counter()
+            if now - last_report >= progress_every:
+                last_report = now
+                elapsed = now - started
+                logger.info(f"{summary['rendered']} rendered, {summary['failed']} failed, "
+                            f"{summary['audio_seconds'] / elapsed:.2f} audio-s/wall-s")
+            return pending
+
+        # Terminate a torn last line so the next record starts cleanly
+        if manifest.tell() > 0:
+            with open(manifest.name, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    manifest.write('\n')
+
+        pool = new_pool()
+        try:
+            pending = {}
+            for row in read_scripts(input_path):
+                if row['id'] in completed:
+                    continue
+                if len(pending) >= max_pending:
+                    pending = drain(pending)
+                pending[pool.submit(_render_one, row, audio_dir)] = row['id']
+            while pending:
+                pending = drain(pending)
+        finally:
+            pool.shutdown()
+            os.fsync(manifest.fileno())
+
+    elapsed = time.perf_counter() - started
+    summary['wall_seconds'] = round(elapsed, 2)
+    summary['audio_seconds'] = round(summary['audio_seconds'], 2)
+    summary['throughput_audio_s_per_wall_s'] = round(summary['audio_seconds'] / elapsed, 3) if elapsed else 0.0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-render campaign scripts to audio')
+    parser.add_argument('input', help='Scripts file (.csv or .jsonl) with id, text, language')
+    parser.add_argument('output', help='Output directory (also holds the resume checkpoint)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-pending', type=int, default=0, help='In-flight rows (default 4 x workers)')
+    parser.add_argument('--archive', help='Also pack results into this .tar/.tar.gz')
+    args = parser.parse_args()
+
+    summary = render_campaign(args.input, args.output, args.workers, args.max_pending)
+    if args.archive:
+        write_archive(args.output, args.archive)
+        summary['archive'] = args.archive
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,310 @@
+"""
+Durable Call Log for Small Calls System
+Append-only SQLite (WAL) store with a background batch writer and hourly rollups
+"""
+
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import argparse
+import threading
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from histograms import quality_bucket, latency_bucket, percentiles
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    language TEXT NOT NULL,
+    text TEXT,
+    quality REAL NOT NULL,
+    latency_ms REAL,
+    success INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_calls_ts ON calls(ts);
+
+CREATE TABLE IF NOT EXISTS call_rollup (
+    hour INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    quality_sum REAL NOT NULL,
+    latency_sum REAL NOT NULL,
+    latency_count INTEGER NOT NULL,
+    PRIMARY KEY (hour, language)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS call_histogram (
+    hour INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour, language, metric, bucket)
+) WITHOUT ROWID;
+"""
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Parse epoch seconds or an ISO 8601 timestamp"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class CallLogStore:
+    """
+    Persistent call history
+    Request threads only enqueue; a background writer flushes batches in one transaction
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        self._local = threading.local()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self.dropped = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+        self._writer = threading.Thread(target=self._run, name='call-log-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls) -> 'CallLogStore':
+        """Build store from environment settings"""
+        return cls(
+            os.getenv('CALL_LOG_PATH', os.path.join('data', 'call_log.db')),
+            flush_interval=float(os.getenv('CALL_LOG_FLUSH_INTERVAL', 1.0)),
+            batch_size=int(os.getenv('CALL_LOG_BATCH_SIZE', 500))
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def append(self, ts: float, language: str, text: str, quality: float,
+               latency_ms: Optional[float], success: bool):
+        """Queue one call record; never blocks on disk"""
+        with self._flushed:
+            self._pending += 1
+        self._queue.put((ts, language, text, quality, latency_ms, 1 if success else 0))
+
+    def _run(self):
+        closing = False
+        while not closing:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is None:
+                break
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    closing = True
+                    break
+                batch.append(record)
+
+            try:
+                self._write_batch(batch)
+            except sqlite3.Error as e:
+                self.dropped += len(batch)
+                logger.error(f"Call log flush failed, dropped {len(batch)} records: {e}")
+
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def _write_batch(self, batch: List[Tuple]):
+        rollup = defaultdict(lambda: [0, 0, 0.0, 0.0, 0])
+        histogram = defaultdict(int)
+        for ts, language, _, quality, latency_ms, success in batch:
+            hour = int(ts // 3600)
+            row = rollup[(hour, language)]
+            row[0] += 1
+            row[1] += success
+            row[2] += quality
+            histogram[(hour, language, 'quality', quality_bucket(quality))] += 1
+            if latency_ms is not None:
+                row[3] += latency_ms
+                row[4] += 1
+                histogram[(hour, language, 'latency_ms', latency_bucket(latency_ms))] += 1
+
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT INTO calls (ts, language, text, quality, latency_ms, success) VALUES (?, ?, ?, ?, ?, ?)',
+                batch)
+            conn.executemany(
+                """INSERT INTO call_rollup VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (hour, language) DO UPDATE SET
+                       calls = calls + excluded.calls,
+                       successes = successes + excluded.successes,
+                       quality_sum = quality_sum + excluded.quality_sum,
+                       latency_sum = latency_sum + excluded.latency_sum,
+                       latency_count = latency_count + excluded.latency_count""",
+                [key + tuple(values) for key, values in rollup.items()])
+            conn.executemany(
+                """INSERT INTO call_histogram VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (hour, language, metric, bucket) DO UPDATE SET
+                       count = count + excluded.count""",
+                [key + (count,) for key, count in histogram.items()])
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far is on disk"""
+        deadline = time.monotonic() + timeout
+        with self._flushed:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._flushed.wait(remaining)
+        return True
+
+    def close(self):
+        """Flush pending records and stop the writer"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+
+    @staticmethod
+    def _hour_range(since: Optional[float], until: Optional[float]) -> Tuple[int, int]:
+        # Rollups are hourly, so ranges snap outward to whole hours
+        start = int(since // 3600) if since is not None else 0
+        end = int(until // 3600) if until is not None else 2 ** 62
+        return start, end
+
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """Totals, success rate, means and percentiles over a time range"""
+        start, end = self._hour_range(since, until)
+        conn = self._connect()
+        calls, successes, quality_sum, latency_sum, latency_count = conn.execute(
+            """SELECT COALESCE(SUM(calls), 0), COALESCE(SUM(successes), 0), COALESCE(SUM(quality_sum), 0),
+                      COALESCE(SUM(latency_sum), 0), COALESCE(SUM(latency_count), 0)
+               FROM call_rollup WHERE hour BETWEEN ? AND ?""", (start, end)).fetchone()
+
+        result = {
+            'total_calls': calls,
+            'success_rate': round(successes / calls, 4) if calls else 0.0,
+            'avg_quality': round(quality_sum / calls, 4) if calls else 0.0,
+            'avg_latency_ms': round(latency_sum / latency_count, 2) if latency_count else None
+        }
+        for metric in ('quality', 'latency_ms'):
+            buckets = conn.execute(
+                """SELECT bucket, SUM(count) FROM call_histogram
+                   WHERE hour BETWEEN ? AND ? AND metric = ? GROUP BY bucket ORDER BY bucket""",
+                (start, end, metric)).fetchall()
+            result[f'{metric}_percentiles'] = percentiles(buckets, metric)
+        return result
+
+    def breakdown(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Per language and hour: counts, success rate, quality and latency percentiles"""
+        start, end = self._hour_range(since, until)
+        conn = self._connect()
+        histograms = defaultdict(list)
+        for hour, language, metric, bucket, count in conn.execute(
+                """SELECT hour, language, metric, bucket, count FROM call_histogram
+                   WHERE hour BETWEEN ? AND ? ORDER BY hour, language, metric, bucket""", (start, end)):
+            histograms[(hour, language, metric)].append((bucket, count))
+
+        rows = []
+        for hour, language, calls, successes, quality_sum, latency_sum, latency_count in conn.execute(
+                """SELECT hour, language, calls, successes, quality_sum, latency_sum, latency_count
+                   FROM call_rollup WHERE hour BETWEEN ? AND ? ORDER BY hour, language""", (start, end)):
+            rows.append({
+                'hour': datetime.fromtimestamp(hour * 3600).isoformat(),
+                'language': language,
+                'calls': calls,
+                'success_rate': round(successes / calls, 4) if calls else 0.0,
+                'avg_quality': round(quality_sum / calls, 4) if calls else 0.0,
+                'avg_latency_ms': round(latency_sum / latency_count, 2) if latency_count else None,
+                'quality_percentiles': percentiles(histograms[(hour, language, 'quality')], 'quality'),
+                'latency_ms_percentiles': percentiles(histograms[(hour, language, 'latency_ms')], 'latency_ms')
+            })
+        return rows
+
+    def top_prompts(self, limit: int = 20, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Most frequent successful prompts since a time, skipping texts truncated at logging"""
+        conn = self._connect()
+        rows = conn.execute(
+            """SELECT text, language, COUNT(*) AS calls FROM calls
+               WHERE ts >= ? AND success = 1 AND text IS NOT NULL AND text != '' AND length(text) <= 100
+               GROUP BY text, language ORDER BY calls DESC LIMIT ?""",
+            (since or 0, limit)).fetchall()
+        return [{'text': text, 'language': language, 'calls': calls} for text, language, calls in rows]
+
+    def export_parquet(self, out_path: str, since: Optional[float] = None, until: Optional[float] = None,
+                       chunk_size: int = 200000) -> int:
+        """Stream a time range of raw calls to a Parquet file; returns rows written"""
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        query = 'SELECT ts, language, text, quality, latency_ms, success FROM calls WHERE ts >= ? AND ts < ? ORDER BY ts'
+        params = (since if since is not None else 0.0, until if until is not None else float('inf'))
+
+        writer = None
+        written = 0
+        try:
+            for chunk in pd.read_sql_query(query, self._connect(), params=params, chunksize=chunk_size):
+                chunk['timestamp'] = pd.to_datetime(chunk.pop('ts'), unit='s')
+                chunk['success'] = chunk['success'].astype(bool)
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_path, table.schema, compression='zstd')
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Call log maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export = subparsers.add_parser('export', help='Export calls to a Parquet file')
+    export.add_argument('output', help='Output .parquet path')
+    export.add_argument('--since', help='Epoch seconds or ISO 8601')
+    export.add_argument('--until', help='Epoch seconds or ISO 8601')
+    export.add_argument('--db', default=None, help='Call log database (defaults to CALL_LOG_PATH)')
+    args = parser.parse_args()
+
+    store = CallLogStore(args.db) if args.db else CallLogStore.from_env()
+    rows = store.export_parquet(args.output, parse_time(args.since), parse_time(args.until))
+    print(f'Exported {rows} calls to {args.output}')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
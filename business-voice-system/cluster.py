@@ -0,0 +1,244 @@
+"""
+Cache-Affinity Cluster Mode for Business Voice System
+Consistent-hash routing of synthesis requests across API nodes
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import bisect
+import hashlib
+import argparse
+import threading
+import subprocess
+import logging
+from typing import Dict, Any, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+FORWARD_HEADER = 'X-Cluster-Forwarded-By'
+# Owner answers that mean "could not serve", as opposed to a real client error. A 503
+# with Retry-After is the owner's admission control shedding load and goes back to the client.
+UNAVAILABLE_STATUSES = {502, 504}
+PEER_RESOLVE_INTERVAL = 60.0
+
+
+def _hash(value: str) -> int:
+    return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes"""
+
+    def __init__(self, nodes: List[str], vnodes: int = 128):
+        self.nodes = sorted(set(nodes))
+        self._ring: List[Tuple[int, str]] = sorted(
+            (_hash(f'{node}#{i}'), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._positions = [position for position, _ in self._ring]
+
+    def preference_list(self, key: str) -> List[str]:
+        """Distinct nodes in ring order starting at the key's owner"""
+        if not self._ring:
+            return []
+        start = bisect.bisect(self._positions, _hash(key)) % len(self._ring)
+        ordered: List[str] = []
+        for offset in range(len(self._ring)):
+            node = self._ring[(start + offset) % len(self._ring)][1]
+            if node not in ordered:
+                ordered.append(node)
+                if len(ordered) == len(self.nodes):
+                    break
+        return ordered
+
+
+class ClusterRouter:
+    """
+    Routes each normalized request key to the node that owns it
+    Unreachable owners are skipped for a cooldown and the request is served locally;
+    an owner that is only busy (503 with Retry-After, or still rendering at the read
+    timeout) keeps the request, and its answer goes back to the client
+    """
+
+    def __init__(self, self_url: str = '', peers: Optional[List[str]] = None,
+                 vnodes: int = 128, forward_timeout: float = 60.0, peer_cooldown: float = 10.0,
+                 connect_timeout: float = 2.0):
+        self.self_url = self_url.rstrip('/')
+        self.peers = [peer.rstrip('/') for peer in (peers or []) if peer.strip()]
+        # The read timeout covers a cold synthesis on the owner (gunicorn's 60 s worker timeout)
+        self.forward_timeout = forward_timeout
+        self.connect_timeout = connect_timeout
+        self.peer_cooldown = peer_cooldown
+        self.enabled = bool(self.self_url and self.peers)
+        self.ring = HashRing(self.peers + [self.self_url], vnodes) if self.enabled else None
+
+        self._lock = threading.Lock()
+        self._down_until: Dict[str, float] = {}
+        self._peer_addresses: Set[str] = set()
+        self._peer_addresses_at = float('-inf')
+        self._session = requests.Session()
+        self.stats = {
+            'served_locally': 0,
+            'forwarded': 0,
+            'received_forwarded': 0,
+            'forward_failures': 0,
+            'owner_busy': 0,
+            'owner_timeouts': 0
+        }
+
+    @classmethod
+    def from_env(cls) -> 'ClusterRouter':
+        """Build router from CLUSTER_SELF and comma-separated CLUSTER_PEERS"""
+        return cls(
+            os.getenv('CLUSTER_SELF', ''),
+            os.getenv('CLUSTER_PEERS', '').split(','),
+            vnodes=int(os.getenv('CLUSTER_VNODES', 128)),
+            forward_timeout=float(os.getenv('CLUSTER_FORWARD_TIMEOUT', 60)),
+            peer_cooldown=float(os.getenv('CLUSTER_PEER_COOLDOWN', 10)),
+            connect_timeout=float(os.getenv('CLUSTER_CONNECT_TIMEOUT', 2))
+        )
+
+    def is_healthy(self, node: str) -> bool:
+        with self._lock:
+            return self._down_until.get(node, 0.0) <= time.monotonic()
+
+    def mark_down(self, node: str):
+        with self._lock:
+            self._down_until[node] = time.monotonic() + self.peer_cooldown
+        logger.warning(f"Cluster peer {node} marked unhealthy for {self.peer_cooldown:.0f}s")
+
+    def owner(self, key: str) -> str:
+        """Owning node for key, or this node if the owner is unhealthy"""
+        preference = self.ring.preference_list(key)
+        if preference[0] == self.self_url or self.is_healthy(preference[0]):
+            return preference[0]
+        return self.self_url
+
+    def _resolve_peers(self) -> Set[str]:
+        """IP addresses of the configured peers, re-resolved at most once a minute"""
+        now = time.monotonic()
+        if now - self._peer_addresses_at < PEER_RESOLVE_INTERVAL:
+            return self._peer_addresses
+        addresses = set()
+        for peer in self.peers:
+            host = urlparse(peer).hostname
+            try:
+                addresses.update(info[4][0] for info in socket.getaddrinfo(host, None))
+            except (socket.gaierror, UnicodeError) as e:
+                logger.warning(f"Could not resolve cluster peer {peer}: {e}")
+        self._peer_addresses, self._peer_addresses_at = addresses, now
+        return addresses
+
+    def is_peer_forwarded(self, req: Any) -> bool:
+        """Request was routed here by a cluster peer (header set and sent from a peer address)"""
+        return bool(self.enabled and req.headers.get(FORWARD_HEADER) and req.remote_addr in self._resolve_peers())
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def forward(self, req: Any, key: str) -> Optional[Tuple[bytes, int, Dict[str, str]]]:
+        """
+        Proxy the request to the owning node
+        Returns a Flask-compatible (body, status, headers) tuple, or None to serve locally
+        """
+        if not self.enabled:
+            return None
+        if req.headers.get(FORWARD_HEADER):
+            # Already routed by a peer; never bounce it again
+            self._count('received_forwarded')
+            return None
+
+        owner = self.owner(key)
+        if owner == self.self_url:
+            self._count('served_locally')
+            return None
+
+        headers = {FORWARD_HEADER: self.self_url, 'Content-Type': req.content_type or 'application/json'}
+        if req.headers.get('X-API-Key'):
+            headers['X-API-Key'] = req.headers['X-API-Key']
+        else:
+            # Keyless clients are rate-limited by address; keep theirs rather than this node's
+            headers['X-Forwarded-For'] = req.remote_addr or 'unknown'
+        try:
+            response = self._session.post(owner + req.path, data=req.get_data(), headers=headers,
+                                          timeout=(self.connect_timeout, self.forward_timeout))
+        except requests.ReadTimeout:
+            # The owner accepted the request and is still rendering it: rendering it here as
+            # well would duplicate the work and leave the result outside the owner's cache
+            logger.warning(f"Owner {owner} did not answer within {self.forward_timeout:.0f}s")
+            self._count('owner_timeouts')
+            body = json.dumps({'error': 'Owning node timed out'}).encode('utf-8')
+            return body, 504, {'Content-Type': 'application/json', 'X-Served-By': owner}
+        except requests.RequestException as e:
+            logger.warning(f"Forward to {owner} failed: {e}")
+            response = None
+
+        if response is None or response.status_code in UNAVAILABLE_STATUSES or \
+                (response.status_code == 503 and 'Retry-After' not in response.headers):
+            self.mark_down(owner)
+            self._count('forward_failures')
+            self._count('served_locally')
+            return None
+
+        self._count('owner_busy' if response.status_code == 503 else 'forwarded')
+        passthrough = {name: value for name, value in response.headers.items()
+                       if name.lower() in ('content-type', 'content-disposition', 'retry-after')}
+        passthrough['X-Served-By'] = owner
+        return response.content, response.status_code, passthrough
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'self': self.self_url or None,
+                'peers': {peer: self._down_until.get(peer, 0.0) <= now for peer in self.peers},
+                'counters': dict(self.stats)
+            }
+
+
+def run_local_cluster(nodes: int, base_port: int, host: str = '127.0.0.1'):
+    """Start several API nodes on one machine wired into one ring"""
+    urls = [f'http://{host}:{base_port + i}' for i in range(nodes)]
+    here = os.path.dirname(os.path.abspath(__file__))
+    processes = []
+    for i, url in enumerate(urls):
+        env = dict(os.environ,
+                   API_PORT=str(base_port + i),
+                   CLUSTER_SELF=url,
+                   CLUSTER_PEERS=','.join(peer for peer in urls if peer != url),
+                   CALL_LOG_PATH=os.path.join('data', f'call_log_{base_port + i}.db'),
+                   PREWARM_DIR=os.path.join('cache', f'prerendered_{base_port + i}'))
+        processes.append(subprocess.Popen([sys.executable, os.path.join(here, 'api_integration.py')],
+                                          cwd=here, env=env))
+        print(f'Node {i}: {url}')
+
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cluster mode utilities')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    local = subparsers.add_parser('local', help='Run a multi-node cluster on this machine')
+    local.add_argument('--nodes', type=int, default=3)
+    local.add_argument('--base-port', type=int, default=5001)
+    args = parser.parse_args()
+
+    run_local_cluster(args.nodes, args.base_port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Hindi-English Code-Switch Segmenter
+Splits mixed text into language-tagged spans and renders them in parallel
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from audio_utils import concat_wav
+
+logger = logging.getLogger(__name__)
+
+# Script classes
+NEUTRAL, LATIN, DEVANAGARI = 0, 1, 2
+
+
+def _build_script_table() -> bytes:
+    """Script class for every BMP code point, computed once at import"""
+    table = bytearray(0x10000)
+    ranges = [
+        (0x0041, 0x005A, LATIN), (0x0061, 0x007A, LATIN),
+        (0x00C0, 0x024F, LATIN), (0x1E00, 0x1EFF, LATIN),
+        (0x0900, 0x097F, DEVANAGARI), (0x1CD0, 0x1CFF, DEVANAGARI), (0xA8E0, 0xA8FF, DEVANAGARI)
+    ]
+    for start, end, script in ranges:
+        table[start:end + 1] = bytes([script]) * (end - start + 1)
+    # Danda and double danda are sentence punctuation, not letters
+    table[0x0964] = table[0x0965] = NEUTRAL
+    # ZWJ/ZWNJ only occur inside Indic conjuncts
+    table[0x200C] = table[0x200D] = DEVANAGARI
+    # Apostrophes stay inside romanized words ("can't", "kal's")
+    table[0x0027] = table[0x2019] = LATIN
+    return bytes(table)
+
+
+SCRIPT_TABLE = _build_script_table()
+
+# Common romanized Hindi words; tokens that are also frequent English words
+# ("to", "me", "the", "main", "par") are deliberately left out
+ROMANIZED_HINDI = frozenset("""
+    aap aapka aapki aapke aapko hum humara humari humare hamara hamari hamare hume humein mujhe mera meri mere
+    tum tumhara tumhari unka unki unke uska uski uske yeh ye woh wo hai hain ho hua hui hue tha thi hoga hogi honge
+    kya kyun kyon kaise kab kahan kaun kitna kitni kitne nahi nahin haan ji accha achha theek thik
+    aur lekin magar ya bhi sirf abhi kal aaj parso jaldi der baad pehle phir fir toh bahut bohot zyada kam
+    ka ki ke ko se mein liye saath kar kiya kiye wala wali wale karna karne karke kariye karein kijiye dijiye bataiye
+    raha rahi rahe gaya gayi gaye dekhiye suniye samajh paisa paise rupaye rupay shukriya dhanyavaad dhanyawad
+    namaste namaskar kripya zaroor bilkul sahi galat jankari jaankari khata baki baaki bhugtan
+""".split())
+
+
+def _span_language(script: int, word: str) -> str:
+    if script == DEVANAGARI:
+        return 'hindi'
+    return 'hindi' if word.lower().strip("'’") in ROMANIZED_HINDI else 'english'
+
+
+def segment(text: str) -> List[Tuple[str, str]]:
+    """
+    Split text into (language, span_text) in one left-to-right pass
+    Neutral characters (spaces, digits, punctuation) attach to the span they follow;
+    leading neutrals attach to the first span
+    """
+    spans: List[List[str]] = []  # [language, text]
+    pending = []  # neutral chars not yet assigned
+    word_start = -1
+    word_script = NEUTRAL
+    table = SCRIPT_TABLE
+
+    def close_word(end: int):
+        word = text[word_start:end]
+        language = _span_language(word_script, word)
+        if spans and spans[-1][0] == language:
+            spans[-1][1] += ''.join(pending) + word
+        else:
+            if spans:
+                spans[-1][1] += ''.join(pending)
+                spans.append([language, word])
+            else:
+                spans.append([language, ''.join(pending) + word])
+        pending.clear()
+
+    for index, char in enumerate(text):
+        code = ord(char)
+        script = table[code] if code < 0x10000 else NEUTRAL
+        # Combining marks (matras, nukta, virama) live inside the Devanagari block
+        if word_start >= 0 and script == word_script:
+            continue
+        if word_start >= 0:
+            close_word(index)
+            word_start = -1
+        if script == NEUTRAL:
+            pending.append(char)
+        else:
+            word_start, word_script = index, script
+
+    if word_start >= 0:
+        close_word(len(text))
+    if pending:
+        if spans:
+            spans[-1][1] += ''.join(pending)
+        else:
+            return [('english', text.strip())] if text.strip() else []
+
+    return [(language, span.strip()) for language, span in spans if span.strip()]
+
+
+class MixedLanguageRenderer:
+    """
+    Renders code-switched text span by span through per-language pipelines
+    Spans go through the caller's cached synthesize function, so common
+    English phrases are reused inside mixed sentences
+    """
+
+    def __init__(self, synthesize: Callable[[str, str], Tuple[Optional[bytes], float]],
+                 max_workers: int = 4, gap_seconds: float = 0.05):
+        self.synthesize = synthesize
+        self.gap_seconds = gap_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mixed-span')
+
+    @classmethod
+    def from_env(cls, synthesize: Callable) -> 'MixedLanguageRenderer':
+        return cls(synthesize, max_workers=int(os.getenv('MIXED_SPAN_WORKERS', 4)))
+
+    def render(self, text: str, **options) -> Tuple[Optional[bytes], float]:
+        """Synthesize spans concurrently and join them in order; options pass through to synthesize"""
+        spans = segment(text)
+        if not spans:
+            return None, 0.0
+        if len(spans) == 1:
+            language, span_text = spans[0]
+            return self.synthesize(span_text, language, **options)
+
+        futures = [self._executor.submit(self.synthesize, span_text, language, **options)
+                   for language, span_text in spans]
+        results = [future.result() for future in futures]
+        if any(not audio_bytes for audio_bytes, _ in results):
+            logger.error(f"Mixed rendering failed for one of {len(spans)} spans")
+            return None, 0.0
+
+        # Character-weighted quality across spans
+        weights = [len(span_text) for _, span_text in spans]
+        quality_score = sum(q * w for (_, q), w in zip(results, weights)) / sum(weights)
+        audio_bytes = concat_wav([audio for audio, _ in results], self.gap_seconds)
+        logger.info(f"Rendered mixed text as {len(spans)} spans: {[language for language, _ in spans]}")
+        return audio_bytes, quality_score
@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for the API server
+Worker count and per-worker thread limits come from autotune.json (see autotune.py);
+the master owns the shared-memory stats segment its workers report into
+"""
+
+import os
+
+from autotune import load_tuned_config, apply_thread_limits
+
+_tuned = load_tuned_config() or {}
+if _tuned:
+    # shared_stats pulls in NumPy here in the master, so limits must already be set
+    apply_thread_limits(_tuned)
+
+from shared_stats import SharedStats, segment_name
+
+bind = f"0.0.0.0:{os.getenv('API_PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', _tuned.get('workers', 4)))
+# Request threads must outnumber admission's in-flight + queued slots, or excess requests
+# wait in gunicorn's backlog and the queue-full / queue-timeout 503s never fire. The spare
+# threads cover long-lived /ws/business-voice sessions, which hold a thread each.
+_admission_slots = int(os.getenv('MAX_IN_FLIGHT', 4)) + int(os.getenv('MAX_QUEUE_DEPTH', 8))
+threads = max(_admission_slots + 1, int(os.getenv('WEB_THREADS', 0) or _admission_slots + 8))
+timeout = 60
+
+
+def post_fork(server, worker):
+    # Each worker gets its own capped BLAS/OpenMP/torch pools
+    if _tuned:
+        apply_thread_limits(_tuned)
+
+
+def on_starting(server):
+    # Fresh host-wide stats segment before any worker attaches
+    server.shared_stats = SharedStats.create(segment_name(), int(os.getenv('SHARED_STATS_SLOTS', 64)))
+
+
+def on_exit(server):
+    server.shared_stats.unlink()
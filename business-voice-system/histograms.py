@@ -0,0 +1,45 @@
+"""
+Call Metric Histograms
+Bucketing and percentile estimation shared by the SQLite call log and the shared-memory stats
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+# Quality in 1% buckets, latency in quarter-octave buckets (~19% resolution)
+LATENCY_BUCKETS_PER_OCTAVE = 4
+
+
+def quality_bucket(quality: float) -> int:
+    return min(100, max(0, int(round(quality * 100))))
+
+
+def latency_bucket(latency_ms: float) -> int:
+    return int(math.floor(math.log2(max(latency_ms, 0.001)) * LATENCY_BUCKETS_PER_OCTAVE))
+
+
+def bucket_value(metric: str, bucket: int) -> float:
+    if metric == 'quality':
+        return bucket / 100
+    # Geometric midpoint of the bucket
+    return 2 ** ((bucket + 0.5) / LATENCY_BUCKETS_PER_OCTAVE)
+
+
+def percentiles(buckets: List[Tuple[int, int]], metric: str,
+                points=(0.5, 0.95, 0.99)) -> Dict[str, Optional[float]]:
+    """Percentiles from (bucket, count) pairs in ascending bucket order"""
+    total = sum(count for _, count in buckets)
+    result = {}
+    for point in points:
+        name = f'p{int(point * 100)}'
+        if not total:
+            result[name] = None
+            continue
+        target = point * total
+        seen = 0
+        for bucket, count in buckets:
+            seen += count
+            if seen >= target:
+                result[name] = round(bucket_value(metric, bucket), 3)
+                break
+    return result
@@ -0,0 +1,293 @@
+"""
+Predictive Pre-Rendering for Business Voice System
+Renders the demo catalog at startup and the most frequent production prompts
+whenever the node is idle, into a store shared by every worker process on the host
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+from synthesis_cache import request_key
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# request_key() output; anything else never reaches the filesystem
+KEY_PATTERN = re.compile(r'[0-9a-f]{40}')
+
+# Built-in client demo catalog (English)
+DEMO_PHRASES = {
+    "account_updates": [
+        "Hello, this is regarding your account update.",
+        "Your account has been successfully verified and is now active.",
+        "We have processed your recent transaction and updated your balance."
+    ],
+    "service_notifications": [
+        "Thank you for choosing our company for your business needs.",
+        "We have an important service update to share with you today.",
+        "Your service request has been completed successfully."
+    ],
+    "follow_up_calls": [
+        "I'm calling to follow up on our previous conversation.",
+        "We wanted to ensure you're satisfied with our recent service.",
+        "Is there anything else we can help you with today?"
+    ],
+    "professional_greetings": [
+        "Good morning, thank you for taking the time to speak with us.",
+        "We appreciate your business and continued partnership.",
+        "This is a courtesy call to update you on your service status."
+    ]
+}
+
+
+def cpu_idle(max_load: float) -> bool:
+    """1-minute load average per CPU below max_load (always True where unavailable)"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1) < max_load
+    except (AttributeError, OSError):
+        return True
+
+
+class PrerenderStore:
+    """
+    Pre-rendered audio on disk, keyed like the synthesis cache
+    Written by the one prewarming worker, read by all workers on the host, so
+    each prompt is rendered once per host rather than once per worker
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = None
+
+    @classmethod
+    def from_env(cls) -> 'PrerenderStore':
+        return cls(os.getenv('PREWARM_DIR', os.path.join('cache', 'prerendered')))
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key, '.json'))
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        if not KEY_PATTERN.fullmatch(key):
+            return None
+        try:
+            with open(self._path(key, '.json'), encoding='utf-8') as f:
+                quality_score = json.load(f)['quality_score']
+            with open(self._path(key, '.wav'), 'rb') as f:
+                return f.read(), quality_score
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, audio_bytes: bytes, quality_score: float, text: str, language: str):
+        # Audio first, metadata last: a key counts as present only once both are complete
+        for suffix, payload in (('.wav', audio_bytes),
+                                ('.json', json.dumps({'quality_score': float(quality_score), 'text': text,
+                                                      'language': language}, ensure_ascii=False).encode('utf-8'))):
+            path = self._path(key, suffix)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(payload)
+            os.replace(path + '.tmp', path)
+
+    def prune(self, keep: Set[str]) -> int:
+        """Remove renders no longer in the catalog or hot set; returns how many"""
+        removed = 0
+        for name in os.listdir(self.directory):
+            key, suffix = os.path.splitext(name)
+            if suffix in ('.json', '.wav') and key not in keep:
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                    removed += suffix == '.json'
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def try_lead(self) -> bool:
+        """Become this host's prewarming process (held until the process exits)"""
+        if self._lock_file is not None or fcntl is None:
+            return True
+        lock_file = open(os.path.join(self.directory, '.prewarm.lock'), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+
+class Prewarmer:
+    """
+    Background pre-renderer
+    Renders at bulk priority, one prompt at a time, and only while is_idle()
+    holds, so live calls always go first. Prompts already rendered are skipped,
+    which makes each pass cheap once the store is warm. Only one worker per host
+    renders (the one holding the store lock); the others stand by and take over
+    if it exits.
+    """
+
+    def __init__(self, synthesize: Callable[[str, str, str], Tuple[Optional[bytes], float]],
+                 prerendered: PrerenderStore, store=None,
+                 is_idle: Optional[Callable[[], bool]] = None,
+                 owns: Optional[Callable[[str], bool]] = None,
+                 catalog: Optional[Dict[str, List[str]]] = None,
+                 top_n: int = 20, window_hours: float = 24.0, interval: float = 300.0,
+                 max_load: float = 0.5):
+        self.synthesize = synthesize
+        self.prerendered = prerendered
+        self.store = store
+        self.is_idle = is_idle or (lambda: True)
+        self.owns = owns or (lambda key: True)
+        self.catalog = catalog if catalog is not None else DEMO_PHRASES
+        self.top_n = top_n
+        self.window_hours = window_hours
+        self.interval = interval
+        self.max_load = max_load
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.progress = {
+            'state': 'not_started',
+            'waiting_for_idle': False,
+            'catalog_total': sum(len(phrases) for phrases in self.catalog.values()),
+            'hot_candidates': 0,
+            'hot_rendered': 0,
+            'passes': 0,
+            'errors': 0,
+            'pruned': 0,
+            'last_pass_at': None
+        }
+
+    @classmethod
+    def from_env(cls, synthesize, prerendered: PrerenderStore, store=None, is_idle=None, owns=None) -> 'Prewarmer':
+        """Build prewarmer from environment settings"""
+        return cls(
+            synthesize, prerendered, store, is_idle, owns,
+            top_n=int(os.getenv('PREWARM_TOP_N', 20)),
+            window_hours=float(os.getenv('PREWARM_WINDOW_HOURS', 24)),
+            interval=float(os.getenv('PREWARM_INTERVAL', 300)),
+            max_load=float(os.getenv('PREWARM_MAX_LOAD', 0.5))
+        )
+
+    def start(self) -> 'Prewarmer':
+        self._thread = threading.Thread(target=self._run, name='prewarm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _set(self, **values):
+        with self._lock:
+            self.progress.update(values)
+
+    def _bump(self, name: str):
+        with self._lock:
+            self.progress[name] += 1
+
+    def _wait_for_idle(self) -> bool:
+        """Block while live traffic or CPU load is present; False if stopping"""
+        while not self._stop.is_set():
+            if self.is_idle() and cpu_idle(self.max_load):
+                self._set(waiting_for_idle=False)
+                return True
+            self._set(waiting_for_idle=True)
+            self._stop.wait(0.5)
+        return False
+
+    def _render(self, text: str, language: str) -> bool:
+        """Render one prompt into the shared store unless it is already there"""
+        key = request_key(text, language)
+        if key in self.prerendered:
+            return False
+        if not self._wait_for_idle():
+            return False
+        try:
+            audio_bytes, quality_score = self.synthesize(text, language, 'bulk')
+            if audio_bytes is None:
+                return False
+            self.prerendered.put(key, audio_bytes, quality_score, text, language)
+        except Exception as e:
+            logger.warning(f"Pre-render failed for '{text[:50]}': {e}")
+            self._bump('errors')
+            return False
+        return True
+
+    def _hot_prompts(self) -> List[Tuple[str, str]]:
+        if not self.store or self.top_n <= 0:
+            return []
+        since = time.time() - self.window_hours * 3600
+        prompts = [(row['text'], row['language']) for row in self.store.top_prompts(self.top_n, since)]
+        # In a cluster only the owning node keeps a prompt warm
+        return [(text, language) for text, language in prompts if self.owns(request_key(text, language))]
+
+    def _run(self):
+        while not self.prerendered.try_lead():
+            # Another worker on this host renders; retry in case it exits
+            self._set(state='standby')
+            if self._stop.wait(min(self.interval, 30.0)):
+                return
+        while not self._stop.is_set():
+            # Catalog first (startup, or re-warm after eviction), then logged hot prompts
+            self._set(state='catalog')
+            for phrases in self.catalog.values():
+                for text in phrases:
+                    if self._stop.is_set():
+                        return
+                    self._render(text, 'english')
+            if not self.progress['passes']:
+                progress = self.get_progress()
+                logger.info(f"Demo catalog warm: {progress['catalog_ready']}/{progress['catalog_total']} phrases rendered")
+
+            self._set(state='hot')
+            try:
+                prompts = self._hot_prompts()
+                prompts_known = True
+            except Exception as e:
+                logger.warning(f"Could not read prompt frequencies: {e}")
+                prompts, prompts_known = [], False
+            self._set(hot_candidates=len(prompts))
+            for text, language in prompts:
+                if self._stop.is_set():
+                    return
+                if self._render(text, language):
+                    self._bump('hot_rendered')
+
+            # Prompts that cooled off leave the store, which stays bounded by catalog + top_n
+            keep = {request_key(text, 'english') for phrases in self.catalog.values() for text in phrases}
+            keep.update(request_key(text, language) for text, language in prompts)
+            if prompts_known:
+                pruned = self.prerendered.prune(keep)
+                with self._lock:
+                    self.progress['pruned'] += pruned
+            self._set(state='waiting', last_pass_at=time.time())
+            self._bump('passes')
+            self._stop.wait(self.interval)
+
+    def catalog_entries(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Catalog with cache keys and whether each phrase is ready to play"""
+        entries = {}
+        for category, phrases in self.catalog.items():
+            entries[category] = []
+            for text in phrases:
+                key = request_key(text, 'english')
+                entries[category].append({'text': text, 'key': key, 'ready': key in self.prerendered})
+        return entries
+
+    def get_progress(self) -> Dict[str, Any]:
+        with self._lock:
+            progress = dict(self.progress)
+        progress['catalog_ready'] = sum(entry['ready'] for entries in self.catalog_entries().values()
+                                        for entry in entries)
+        return progress
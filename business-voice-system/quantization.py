@@ -0,0 +1,277 @@
+"""
+Quantized CPU Inference for snorTTS Backend
+int8 dynamic quantization with an on-disk artifact cache and fp32 comparison
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import queue
+import hashlib
+import logging
+import argparse
+import resource
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_MODES = ('fp32', 'int8')
+DEFAULT_CACHE_DIR = os.path.join('cache', 'quantized')
+WEIGHT_FILE_SUFFIXES = ('.safetensors', '.bin', '.pt', '.pth', '.ckpt', 'config.json')
+
+
+def get_inference_mode() -> str:
+    """Inference mode from INFERENCE_MODE env (fp32 or int8)"""
+    mode = os.getenv('INFERENCE_MODE', 'fp32').lower()
+    if mode not in INFERENCE_MODES:
+        logger.warning(f"Unknown INFERENCE_MODE '{mode}', falling back to fp32")
+        return 'fp32'
+    return mode
+
+
+def _weights_fingerprint(model_name: str) -> str:
+    """
+    Identity of the weights behind model_name: size and mtime of a local path's
+    weight files, or the commit of a cached Hugging Face download ('' if unknown)
+    """
+    if os.path.exists(model_name):
+        if os.path.isdir(model_name):
+            paths = sorted(entry.path for entry in os.scandir(model_name)
+                           if entry.is_file() and entry.name.endswith(WEIGHT_FILE_SUFFIXES))
+        else:
+            paths = [model_name]
+        stats = [(os.path.basename(path), os.stat(path)) for path in paths]
+        return ';'.join(f'{name}:{stat.st_size}:{stat.st_mtime_ns}' for name, stat in stats)
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return ''
+    # Cached files live under snapshots/<commit>/
+    config_path = try_to_load_from_cache(model_name, 'config.json')
+    return f'rev:{os.path.basename(os.path.dirname(config_path))}' if isinstance(config_path, str) else ''
+
+
+def _artifact_path(model_name: str, cache_dir: str) -> str:
+    # Key on the weights too, so a retrained local model or new revision is re-quantized,
+    # and on torch version: pickled quantized modules are not portable across releases
+    fingerprint = _weights_fingerprint(model_name)
+    key = hashlib.sha256(f'{model_name}|{fingerprint}|{torch.__version__}|int8-dynamic'.encode()).hexdigest()[:16]
+    safe_name = model_name.replace('/', '_').replace('\\', '_')
+    return os.path.join(cache_dir, f'{safe_name}-{key}.int8.pt')
+
+
+def _cache_dir(cache_dir: Optional[str] = None) -> str:
+    return cache_dir or os.getenv('QUANTIZED_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+def quantize_dynamic_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Apply int8 dynamic quantization to all nn.Linear layers"""
+    model = model.to('cpu').eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_or_quantize(model_name: str,
+                     load_fp32: Callable[[], torch.nn.Module],
+                     cache_dir: Optional[str] = None) -> torch.nn.Module:
+    """
+    Return the int8 model for model_name
+    Uses the cached artifact when present; otherwise loads fp32, converts and caches
+    """
+    cache_dir = _cache_dir(cache_dir)
+    path = _artifact_path(model_name, cache_dir)
+
+    if os.path.exists(path):
+        try:
+            model = torch.load(path, map_location='cpu', weights_only=False)
+            logger.info(f"Loaded cached int8 model from {path}")
+            return model.eval()
+        except Exception as e:
+            logger.warning(f"Cached int8 model unusable, re-quantizing: {e}")
+
+    started = time.perf_counter()
+    model = quantize_dynamic_int8(load_fp32())
+    logger.info(f"Quantized {model_name} to int8 in {time.perf_counter() - started:.1f}s")
+
+    # A first download only now has a resolvable revision to key on
+    path = _artifact_path(model_name, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Could not cache int8 model to {path}: {e}")
+
+    return model
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        # Peak RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def audio_difference(reference: np.ndarray, candidate: np.ndarray, n_fft: int = 512) -> Dict[str, float]:
+    """
+    Objective difference between two renderings of the same input
+    SNR of candidate vs reference and log-spectral distance in dB
+    """
+    reference = np.asarray(reference, dtype=np.float64).ravel()
+    candidate = np.asarray(candidate, dtype=np.float64).ravel()
+    length = min(len(reference), len(candidate))
+    reference, candidate = reference[:length], candidate[:length]
+
+    noise = np.sum((reference - candidate) ** 2)
+    signal = np.sum(reference ** 2)
+    snr_db = float('inf') if noise == 0 else 10 * np.log10(max(signal, 1e-20) / noise)
+
+    frames = max(1, length // n_fft)
+    ref_frames = np.resize(reference, frames * n_fft).reshape(frames, n_fft)
+    cand_frames = np.resize(candidate, frames * n_fft).reshape(frames, n_fft)
+    window = np.hanning(n_fft)
+    ref_power = np.abs(np.fft.rfft(ref_frames * window, axis=1)) ** 2 + 1e-10
+    cand_power = np.abs(np.fft.rfft(cand_frames * window, axis=1)) ** 2 + 1e-10
+    lsd = np.mean(np.sqrt(np.mean((10 * np.log10(ref_power / cand_power)) ** 2, axis=1)))
+
+    return {'snr_db': round(float(snr_db), 2), 'log_spectral_distance_db': round(float(lsd), 3)}
+
+
+def _to_array(output: Any) -> np.ndarray:
+    if isinstance(output, (tuple, list)):
+        output = output[0]
+    output = getattr(output, 'waveform', getattr(output, 'last_hidden_state', output))
+    return output.detach().float().cpu().numpy()
+
+
+def _time_model(model: torch.nn.Module, inputs: List[Dict[str, torch.Tensor]], repeats: int) -> Dict[str, Any]:
+    latencies = []
+    outputs = []
+    with torch.inference_mode():
+        model(**inputs[0])  # warm-up
+        for batch in inputs:
+            for _ in range(repeats):
+                started = time.perf_counter()
+                output = model(**batch)
+                latencies.append((time.perf_counter() - started) * 1000)
+            outputs.append(_to_array(output))
+    latencies.sort()
+    return {
+        'latency_ms_p50': round(latencies[len(latencies) // 2], 2),
+        'latency_ms_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        'outputs': outputs
+    }
+
+
+def _artifact_rss_worker(path: str, results):
+    rss_before = current_rss_mb()
+    model = torch.load(path, map_location='cpu', weights_only=False)
+    results.put(current_rss_mb() - rss_before)
+    del model
+
+
+def artifact_rss_mb(path: str, timeout: float = 600.0) -> Optional[float]:
+    """RSS growth from loading the int8 artifact in a fresh process (None if it fails)"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_artifact_rss_worker, args=(path, results))
+    process.start()
+    try:
+        return results.get(timeout=timeout)
+    except queue.Empty:
+        logger.error(f"Could not measure RSS of {path}")
+        return None
+    finally:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+
+def compare_inference_modes(load_fp32: Callable[[], torch.nn.Module],
+                            inputs: List[Dict[str, torch.Tensor]],
+                            model_name: str,
+                            cache_dir: Optional[str] = None,
+                            repeats: int = 5) -> Dict[str, Any]:
+    """
+    Benchmark fp32 vs int8 on CPU: latency, RSS growth and output difference
+    inputs are keyword batches for model(**batch), e.g. tokenizer(text, return_tensors='pt')
+    int8 RSS is measured in a separate process, so fp32 weights never count toward it
+    """
+    report: Dict[str, Any] = {'model': model_name, 'torch': torch.__version__, 'threads': torch.get_num_threads()}
+    cache_dir = _cache_dir(cache_dir)
+
+    rss_before = current_rss_mb()
+    fp32_model = load_fp32().to('cpu').eval()
+    fp32_rss = current_rss_mb() - rss_before
+    fp32 = _time_model(fp32_model, inputs, repeats)
+    del fp32_model
+    gc.collect()
+
+    from_cache = os.path.exists(_artifact_path(model_name, cache_dir))
+    started = time.perf_counter()
+    int8_model = load_or_quantize(model_name, load_fp32, cache_dir)
+    int8_load_s = time.perf_counter() - started
+    int8 = _time_model(int8_model, inputs, repeats)
+    del int8_model
+    gc.collect()
+    int8_rss = artifact_rss_mb(_artifact_path(model_name, cache_dir))
+
+    differences = [audio_difference(ref, cand) for ref, cand in zip(fp32['outputs'], int8['outputs'])]
+    report['fp32'] = {
+        'latency_ms_p50': fp32['latency_ms_p50'],
+        'latency_ms_p95': fp32['latency_ms_p95'],
+        'rss_mb': round(fp32_rss, 1)
+    }
+    report['int8'] = {
+        'latency_ms_p50': int8['latency_ms_p50'],
+        'latency_ms_p95': int8['latency_ms_p95'],
+        'rss_mb': round(int8_rss, 1) if int8_rss is not None else None,
+        'load_s': round(int8_load_s, 2),
+        'from_cache': from_cache
+    }
+    report['speedup_p50'] = round(fp32['latency_ms_p50'] / max(int8['latency_ms_p50'], 1e-6), 2)
+    report['difference'] = {
+        'snr_db_min': min(d['snr_db'] for d in differences),
+        'log_spectral_distance_db_max': max(d['log_spectral_distance_db'] for d in differences)
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare fp32 and int8 CPU inference for the snorTTS backend')
+    parser.add_argument('--model', required=True, help='Hugging Face model id or local path')
+    parser.add_argument('--text', action='append', help='Input text (repeatable); defaults to demo phrases')
+    parser.add_argument('--cache-dir', default=None, help='Quantized artifact cache directory')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer, AutoModel
+
+    texts = args.text or [
+        "Hello, this is regarding your account update.",
+        "Thank you for choosing our company for your business needs."
+    ]
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    inputs = [dict(tokenizer(text, return_tensors='pt')) for text in texts]
+
+    report = compare_inference_modes(
+        lambda: AutoModel.from_pretrained(args.model),
+        inputs, args.model, args.cache_dir, args.repeats
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,467 @@
+"""
+RTP Packetized Output for Telephony Media Gateways
+Paced 20 ms G.711 (PCMU/PCMA) frames over UDP, fed from synthesis through a preallocated ring buffer
+
+Usage:
+    python rtp.py receive --port 40000 --output received.wav   # local test receiver
+    python rtp.py send voice.wav 127.0.0.1 40000 --payload pcmu
+"""
+
+import os
+import time
+import socket
+import struct
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from fractions import Fraction
+from typing import Callable, Dict, Any, Optional
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from audio_utils import decode_wav, encode_wav
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000  # 160 bytes of G.711 per packet
+RTP_HEADER = struct.Struct('!BBHII')
+PAYLOAD_TYPES = {'pcmu': 0, 'pcma': 8}
+
+
+def _build_ulaw_table() -> np.ndarray:
+    """G.711 mu-law code for every 16-bit sample, indexed by sample & 0xFFFF"""
+    pcm = np.arange(65536, dtype=np.int32)
+    pcm = np.where(pcm >= 32768, pcm - 65536, pcm) >> 2
+    mask = np.where(pcm >= 0, 0xFF, 0x7F)
+    pcm = np.minimum(np.where(pcm >= 0, pcm, -pcm), 8159) + 0x21
+    segment = np.searchsorted(np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), pcm)
+    code = (segment << 4) | ((pcm >> (segment + 1)) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return (code ^ mask).astype(np.uint8)
+
+
+def _build_alaw_table() -> np.ndarray:
+    """G.711 A-law code for every 16-bit sample, indexed by sample & 0xFFFF"""
+    pcm = np.arange(65536, dtype=np.int32)
+    pcm = np.where(pcm >= 32768, pcm - 65536, pcm) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    pcm = np.where(pcm >= 0, pcm, -pcm - 1)
+    segment = np.searchsorted(np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF]), pcm)
+    shift = np.where(segment < 2, 1, segment)
+    code = (np.minimum(segment, 7) << 4) | ((pcm >> shift) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return (code ^ mask).astype(np.uint8)
+
+
+def _build_decode_tables() -> Dict[int, np.ndarray]:
+    """Linear float value of every mu-law / A-law code, keyed by RTP payload type"""
+    code = np.arange(256, dtype=np.int32)
+    ulaw = ~code & 0xFF
+    exponent = (ulaw >> 4) & 0x07
+    magnitude = ((((ulaw & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    ulaw_linear = np.where(ulaw & 0x80, -magnitude, magnitude)
+
+    alaw = code ^ 0x55
+    segment = (alaw & 0x70) >> 4
+    magnitude = ((alaw & 0x0F) << 4) + np.where(segment == 0, 8, 0x108)
+    magnitude = np.where(segment > 1, magnitude << np.maximum(segment - 1, 0), magnitude)
+    alaw_linear = np.where(alaw & 0x80, magnitude, -magnitude)
+    return {0: (ulaw_linear / 32768.0).astype(np.float32), 8: (alaw_linear / 32768.0).astype(np.float32)}
+
+
+ENCODE_TABLES = {'pcmu': _build_ulaw_table(), 'pcma': _build_alaw_table()}
+DECODE_TABLES = _build_decode_tables()
+SILENCE_CODES = {'pcmu': 0xFF, 'pcma': 0xD5}
+
+
+def to_g711(audio_bytes: bytes, payload: str = 'pcmu') -> bytes:
+    """WAV bytes -> 8 kHz G.711 bytes (anti-aliased polyphase resample, table encode)"""
+    samples, sample_rate = decode_wav(audio_bytes)
+    if sample_rate != SAMPLE_RATE:
+        ratio = Fraction(SAMPLE_RATE, sample_rate).limit_denominator(1000)
+        samples = resample_poly(samples, ratio.numerator, ratio.denominator)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    return ENCODE_TABLES[payload][pcm.view(np.uint16)].tobytes()
+
+
+class RingBuffer:
+    """
+    Fixed-capacity byte ring between synthesis (writer) and the pacer (reader)
+    Allocated once; writers block while full so a fast producer cannot grow memory
+    """
+
+    def __init__(self, capacity: int):
+        self._data = bytearray(capacity)
+        self._view = memoryview(self._data)
+        self.capacity = capacity
+        self._read = 0
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def write(self, payload: bytes, timeout: Optional[float] = None) -> bool:
+        """Append all of payload, waiting for space; False if closed or timed out"""
+        source = memoryview(payload)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(source):
+                while self._size == self.capacity and not self._closed:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return False
+                start = (self._read + self._size) % self.capacity
+                count = min(len(source), self.capacity - self._size, self.capacity - start)
+                self._view[start:start + count] = source[:count]
+                self._size += count
+                source = source[count:]
+                self._cond.notify_all()
+        return True
+
+    def read_into(self, target: memoryview) -> int:
+        """Copy up to len(target) buffered bytes without waiting; returns bytes copied"""
+        with self._cond:
+            count = min(len(target), self._size)
+            first = min(count, self.capacity - self._read)
+            target[:first] = self._view[self._read:self._read + first]
+            if count > first:
+                target[first:count] = self._view[:count - first]
+            self._read = (self._read + count) % self.capacity
+            self._size -= count
+            if count:
+                self._cond.notify_all()
+            return count
+
+    def wait_readable(self, timeout: float) -> bool:
+        """Wait until there is data to read; False on timeout or close"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._size or self._closed, timeout) and self._size > 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return self._size
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class RTPStreamer:
+    """
+    One outbound RTP stream
+    feed() encodes synthesized audio into the ring; the pacer thread sends a
+    20 ms packet on an absolute schedule, so timestamps advance by exactly
+    FRAME_SAMPLES per packet. Underruns mid-stream are filled with G.711 silence
+    to keep the far end's jitter buffer fed; the marker bit flags the first packet
+    """
+
+    def __init__(self, host: str, port: int, payload: str = 'pcmu', buffer_seconds: float = 2.0,
+                 ssrc: Optional[int] = None, max_idle_seconds: float = 10.0):
+        if payload not in PAYLOAD_TYPES:
+            raise ValueError(f'Unknown payload: {payload} (use one of {", ".join(PAYLOAD_TYPES)})')
+        self.address = (host, port)
+        self.payload = payload
+        self.payload_type = PAYLOAD_TYPES[payload]
+        self.ssrc = ssrc if ssrc is not None else random.getrandbits(32)
+        self.max_idle_seconds = max_idle_seconds
+        self._sequence = random.getrandbits(16)
+        self._timestamp = random.getrandbits(32)
+        self._ring = RingBuffer(int(buffer_seconds * 1000 / FRAME_MS) * FRAME_SAMPLES)
+        # One packet buffer reused for every send
+        self._packet = bytearray(RTP_HEADER.size + FRAME_SAMPLES)
+        self._payload_view = memoryview(self._packet)[RTP_HEADER.size:]
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._finished = threading.Event()
+        self._stopped = threading.Event()
+        self.stats = {'packets': 0, 'silence_packets': 0, 'underruns': 0, 'late_packets': 0,
+                      'max_lateness_ms': 0.0, 'first_packet_at': None, 'stopped': False}
+        self._pacer = threading.Thread(target=self._pace, name='rtp-pacer', daemon=True)
+
+    def start(self) -> 'RTPStreamer':
+        self._pacer.start()
+        return self
+
+    def feed(self, audio_bytes: bytes) -> bool:
+        """Queue a synthesized WAV segment; blocks while the ring is full"""
+        return self._ring.write(to_g711(audio_bytes, self.payload))
+
+    def finish(self):
+        """No more audio: send what is buffered, pad the last frame and stop"""
+        self._finished.set()
+
+    def stop(self):
+        """Stop immediately, dropping buffered audio (barge-in, hang-up)"""
+        self.stats['stopped'] = True
+        self._stopped.set()
+        self._ring.close()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._pacer.join(timeout)
+        return not self._pacer.is_alive()
+
+    def _send(self, marker: bool):
+        RTP_HEADER.pack_into(self._packet, 0, 0x80, (0x80 if marker else 0) | self.payload_type,
+                             self._sequence, self._timestamp, self.ssrc)
+        self._socket.sendto(self._packet, self.address)
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        self._timestamp = (self._timestamp + FRAME_SAMPLES) & 0xFFFFFFFF
+        self.stats['packets'] += 1
+
+    def _pace(self):
+        # Nothing goes out until the first segment is synthesized
+        while not self._ring.wait_readable(0.05):
+            if self._finished.is_set() or self._stopped.is_set():
+                self._socket.close()
+                return
+        silence = SILENCE_CODES[self.payload]
+        frame_seconds = FRAME_MS / 1000
+        started = time.perf_counter()
+        self.stats['first_packet_at'] = time.time()
+        frame_index = 0
+        idle_since = None
+        underrun = False
+        try:
+            while not self._stopped.is_set():
+                count = self._ring.read_into(self._payload_view)
+                if count < FRAME_SAMPLES:
+                    if count == 0 and self._finished.is_set():
+                        break
+                    # Underrun or final partial frame: pad with silence
+                    self._payload_view[count:] = bytes([silence]) * (FRAME_SAMPLES - count)
+                    if count == 0:
+                        self.stats['silence_packets'] += 1
+                        if not underrun:
+                            self.stats['underruns'] += 1
+                            underrun = True
+                        idle_since = idle_since or time.perf_counter()
+                        if time.perf_counter() - idle_since > self.max_idle_seconds:
+                            break
+                else:
+                    underrun = False
+                    idle_since = None
+                self._send(marker=frame_index == 0)
+
+                frame_index += 1
+                # Absolute schedule: sleep jitter never accumulates into drift
+                delay = started + frame_index * frame_seconds - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif -delay > frame_seconds:
+                    self.stats['late_packets'] += 1
+                    self.stats['max_lateness_ms'] = max(self.stats['max_lateness_ms'], round(-delay * 1000, 2))
+        finally:
+            self._ring.close()
+            self._socket.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, ssrc=self.ssrc, payload=self.payload,
+                    destination=f'{self.address[0]}:{self.address[1]}', buffered_ms=len(self._ring) // 8)
+
+
+class StopRelay:
+    """
+    Delivers stop (barge-in) requests to the worker process that owns a stream
+    Under a multi-worker server any worker may receive the stop call: each
+    process records its streams as <ssrc>.owner files in a shared directory and
+    listens on a Unix datagram socket, <pid>.sock, for ssrcs to stop. Where Unix
+    sockets are unavailable only locally owned streams can be stopped
+    """
+
+    def __init__(self, directory: str, on_stop: Callable[[int], Any]):
+        self.directory = directory
+        self.on_stop = on_stop
+        self.enabled = hasattr(socket, 'AF_UNIX')
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, on_stop: Callable[[int], Any]) -> 'StopRelay':
+        directory = os.getenv('RTP_CONTROL_DIR') or \
+            os.path.join(tempfile.gettempdir(), f"bvs-rtp-{os.getenv('API_PORT', 5000)}")
+        return cls(directory, on_stop)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _listen(self):
+        # Started lazily, and again after a fork, so every worker binds its own socket
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._prune()
+            path = self._path(f'{os.getpid()}.sock')
+            if os.path.exists(path):
+                os.unlink(path)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            listener.bind(path)
+            self._listener_pid = os.getpid()
+        threading.Thread(target=self._serve, args=(listener,), name='rtp-stop-relay', daemon=True).start()
+
+    def _prune(self):
+        """Drop sockets and stream records left by workers that died"""
+        for name in os.listdir(self.directory):
+            try:
+                if name.endswith('.sock'):
+                    pid = int(name[:-len('.sock')])
+                elif name.endswith('.owner'):
+                    with open(self._path(name)) as f:
+                        pid = int(f.read())
+                else:
+                    continue
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                try:
+                    os.unlink(self._path(name))
+                except FileNotFoundError:
+                    pass
+            except (OSError, ValueError):
+                continue
+
+    def _serve(self, listener: socket.socket):
+        while True:
+            data = listener.recv(32)
+            try:
+                self.on_stop(int(data))
+            except Exception as e:
+                logger.warning(f"Relayed RTP stop failed: {e}")
+
+    def register(self, ssrc: int):
+        if not self.enabled:
+            return
+        self._listen()
+        with open(self._path(f'{ssrc}.owner'), 'w') as f:
+            f.write(str(os.getpid()))
+
+    def unregister(self, ssrc: int):
+        if self.enabled:
+            try:
+                os.unlink(self._path(f'{ssrc}.owner'))
+            except FileNotFoundError:
+                pass
+
+    def owner(self, ssrc: int) -> Optional[int]:
+        """Pid of the live process streaming ssrc, if any"""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(f'{ssrc}.owner')) as f:
+                pid = int(f.read())
+            os.kill(pid, 0)
+        except (FileNotFoundError, ValueError):
+            return None
+        except ProcessLookupError:
+            # Owner died mid-stream
+            self.unregister(ssrc)
+            return None
+        except PermissionError:
+            pass
+        return pid
+
+    def send_stop(self, ssrc: int) -> Optional[int]:
+        """Ask the owning worker to stop ssrc; returns its pid, or None if no owner is reachable"""
+        pid = self.owner(ssrc)
+        if pid is None:
+            return None
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            sender.sendto(str(ssrc).encode(), self._path(f'{pid}.sock'))
+        except OSError as e:
+            logger.warning(f"Could not relay stop for RTP stream {ssrc} to worker {pid}: {e}")
+            return None
+        finally:
+            sender.close()
+        return pid
+
+
+def receive(port: int, output: Optional[str] = None, idle_timeout: float = 3.0,
+            host: str = '127.0.0.1') -> Dict[str, Any]:
+    """
+    Local test receiver: collect one RTP stream and report sequence gaps,
+    timestamp steps and interarrival jitter (RFC 3550 estimator)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    sock.settimeout(idle_timeout)
+    packets = []
+    try:
+        while True:
+            try:
+                data, _ = sock.recvfrom(2048)
+            except socket.timeout:
+                if packets:
+                    break
+                continue
+            packets.append((time.perf_counter(), data))
+    finally:
+        sock.close()
+
+    report: Dict[str, Any] = {'packets': len(packets)}
+    if not packets:
+        return report
+
+    headers = [RTP_HEADER.unpack_from(data) for _, data in packets]
+    sequence_gaps = sum(1 for a, b in zip(headers, headers[1:]) if (b[2] - a[2]) & 0xFFFF != 1)
+    timestamp_steps = {(b[3] - a[3]) & 0xFFFFFFFF for a, b in zip(headers, headers[1:])}
+    jitter = 0.0
+    for (arrival_a, _), (arrival_b, _), a, b in zip(packets, packets[1:], headers, headers[1:]):
+        transit_delta = (arrival_b - arrival_a) - ((b[3] - a[3]) & 0xFFFFFFFF) / SAMPLE_RATE
+        jitter += (abs(transit_delta) - jitter) / 16
+
+    report.update({
+        'ssrc': headers[0][4],
+        'payload_type': headers[0][1] & 0x7F,
+        'marker_first': bool(headers[0][1] & 0x80),
+        'sequence_gaps': sequence_gaps,
+        'timestamp_steps': sorted(timestamp_steps),
+        'duration_s': round(len(packets) * FRAME_MS / 1000, 2),
+        'wall_s': round(packets[-1][0] - packets[0][0], 3),
+        'jitter_ms': round(jitter * 1000, 3)
+    })
+    if output:
+        table = DECODE_TABLES[report['payload_type']]
+        codes = np.frombuffer(b''.join(data[RTP_HEADER.size:] for _, data in packets), dtype=np.uint8)
+        with open(output, 'wb') as f:
+            f.write(encode_wav(table[codes], SAMPLE_RATE))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RTP G.711 sender / local test receiver')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    receiver = commands.add_parser('receive', help='Receive one stream and report timing')
+    receiver.add_argument('--port', type=int, default=40000)
+    receiver.add_argument('--host', default='127.0.0.1')
+    receiver.add_argument('--output', help='Write received audio as 8 kHz WAV')
+
+    sender = commands.add_parser('send', help='Stream a WAV file')
+    sender.add_argument('wav')
+    sender.add_argument('host')
+    sender.add_argument('port', type=int)
+    sender.add_argument('--payload', choices=sorted(PAYLOAD_TYPES), default='pcmu')
+
+    args = parser.parse_args()
+    if args.command == 'receive':
+        print(receive(args.port, args.output, host=args.host))
+    else:
+        with open(args.wav, 'rb') as f:
+            audio_bytes = f.read()
+        streamer = RTPStreamer(args.host, args.port, args.payload).start()
+        streamer.feed(audio_bytes)
+        streamer.finish()
+        streamer.wait()
+        print(streamer.get_stats())
+
+
+if __name__ == '__main__':
+    main()
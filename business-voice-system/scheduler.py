@@ -0,0 +1,180 @@
+"""
+Cost-Aware Priority Scheduler for Voice Synthesis
+Interactive / standard / bulk classes, shortest-job-first within a class
+"""
+
+import os
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+PRIORITY_CLASSES = ('interactive', 'standard', 'bulk')
+
+
+def estimate_cost(text: str) -> float:
+    """Expected audio seconds, same rule the generator uses for duration"""
+    return max(len(text) * 0.08, 1.5)
+
+
+class _Job:
+    __slots__ = ('fn', 'args', 'cost', 'priority', 'enqueued', 'future', 'taken')
+
+    def __init__(self, fn: Callable, args: tuple, cost: float, priority: str):
+        self.fn = fn
+        self.args = args
+        self.cost = cost
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.future: Future = Future()
+        self.taken = False
+
+
+class PriorityScheduler:
+    """
+    Runs synthesis jobs on a fixed worker pool
+    Higher classes always go first, except that a lower-class job waiting longer
+    than its starvation limit is promoted ahead of everything. Promotions are
+    capped at promotion_share of dispatches so a large overdue backlog cannot
+    in turn starve interactive work
+    """
+
+    def __init__(self, workers: int = 2, starvation_limits: Optional[Dict[str, float]] = None,
+                 promotion_share: float = 0.25, wait_samples: int = 1000):
+        self.starvation_limits = starvation_limits or {'standard': 2.0, 'bulk': 10.0}
+        self.promotion_interval = max(1, int(round(1 / max(promotion_share, 0.01))))
+        self._dispatched = 0
+        self._last_promotion = -self.promotion_interval
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        # Per class: SJF heap of (cost, seq, job) and FIFO for starvation checks;
+        # a job taken from one structure is lazily skipped in the other
+        self._heaps: Dict[str, List] = {name: [] for name in PRIORITY_CLASSES}
+        self._fifos: Dict[str, Deque[_Job]] = {name: deque() for name in PRIORITY_CLASSES}
+        self._queued = {name: 0 for name in PRIORITY_CLASSES}
+        self._waits: Dict[str, Deque[float]] = {name: deque(maxlen=wait_samples) for name in PRIORITY_CLASSES}
+        self._completed = {name: 0 for name in PRIORITY_CLASSES}
+        self._promoted = {name: 0 for name in PRIORITY_CLASSES}
+        self._max_wait = {name: 0.0 for name in PRIORITY_CLASSES}
+
+        self._workers = [threading.Thread(target=self._run, name=f'synth-worker-{i}', daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    @classmethod
+    def from_env(cls) -> 'PriorityScheduler':
+        """Build scheduler from environment settings"""
+        return cls(
+            workers=int(os.getenv('SYNTH_WORKERS', 2)),
+            starvation_limits={
+                'standard': float(os.getenv('STARVATION_STANDARD_S', 2.0)),
+                'bulk': float(os.getenv('STARVATION_BULK_S', 10.0))
+            },
+            promotion_share=float(os.getenv('PROMOTION_SHARE', 0.25))
+        )
+
+    def submit(self, fn: Callable, *args: Any, cost: float = 1.0, priority: str = 'standard') -> Future:
+        """Queue fn(*args) in a priority class; cost orders jobs within the class"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f'Unknown priority class: {priority}')
+        job = _Job(fn, args, cost, priority)
+        with self._cond:
+            heapq.heappush(self._heaps[priority], (cost, next(self._seq), job))
+            self._fifos[priority].append(job)
+            self._queued[priority] += 1
+            self._cond.notify()
+        return job.future
+
+    def run(self, fn: Callable, *args: Any, cost: float = 1.0, priority: str = 'standard') -> Any:
+        """Blocking helper: submit and wait for the result"""
+        return self.submit(fn, *args, cost=cost, priority=priority).result()
+
+    def _oldest(self, priority: str) -> Optional[_Job]:
+        fifo = self._fifos[priority]
+        while fifo and fifo[0].taken:
+            fifo.popleft()
+        return fifo[0] if fifo else None
+
+    def _shortest(self, priority: str) -> Optional[_Job]:
+        heap = self._heaps[priority]
+        while heap and heap[0][2].taken:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def _next_job(self) -> Optional[_Job]:
+        now = time.perf_counter()
+        # Starvation protection: the most overdue lower-class job goes first
+        overdue = None
+        promotion_allowed = self._dispatched - self._last_promotion >= self.promotion_interval
+        for priority, limit in (self.starvation_limits.items() if promotion_allowed else ()):
+            job = self._oldest(priority)
+            if job is not None:
+                lateness = (now - job.enqueued) - limit
+                if lateness > 0 and (overdue is None or lateness > overdue[0]):
+                    overdue = (lateness, job)
+        if overdue is not None:
+            job = overdue[1]
+            self._promoted[job.priority] += 1
+            self._last_promotion = self._dispatched
+        else:
+            job = None
+            for priority in PRIORITY_CLASSES:
+                job = self._shortest(priority)
+                if job is not None:
+                    break
+        if job is not None:
+            job.taken = True
+            self._dispatched += 1
+            self._queued[job.priority] -= 1
+        return job
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                waited = time.perf_counter() - job.enqueued
+                self._waits[job.priority].append(waited)
+                self._max_wait[job.priority] = max(self._max_wait[job.priority], waited)
+
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                job.future.set_result(job.fn(*job.args))
+            except Exception as e:
+                job.future.set_exception(e)
+
+            with self._cond:
+                self._completed[job.priority] += 1
+
+    @staticmethod
+    def _percentile(samples: List[float], point: float) -> float:
+        return samples[min(len(samples) - 1, int(len(samples) * point))] * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-class queue depth, completions, promotions and queue wait percentiles"""
+        with self._cond:
+            snapshot = {name: sorted(self._waits[name]) for name in PRIORITY_CLASSES}
+            stats = {
+                'workers': len(self._workers),
+                'starvation_limits_s': dict(self.starvation_limits),
+                'promotion_interval': self.promotion_interval,
+                'classes': {}
+            }
+            for name in PRIORITY_CLASSES:
+                waits = snapshot[name]
+                stats['classes'][name] = {
+                    'queued': self._queued[name],
+                    'completed': self._completed[name],
+                    'promoted': self._promoted[name],
+                    'wait_ms_p50': round(self._percentile(waits, 0.50), 2) if waits else None,
+                    'wait_ms_p99': round(self._percentile(waits, 0.99), 2) if waits else None,
+                    'wait_ms_max': round(self._max_wait[name] * 1000, 2)
+                }
+            return stats
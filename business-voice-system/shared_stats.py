@@ -0,0 +1,325 @@
+"""
+Host-Wide Call Statistics in Shared Memory
+Counters, histograms, recent calls and live load shared by all API worker processes on a host
+
+Each worker owns one stripe (slot) of the segment and is its only writer, so
+updates need no cross-process locks; readers sum the stripes. Recent-call
+records use a per-record sequence number (seqlock) so readers skip torn writes.
+"""
+
+import os
+import sys
+import atexit
+import tempfile
+import logging
+import threading
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from histograms import quality_bucket, latency_bucket, percentiles
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = 0x42565353544154  # "BVSSTAT"
+VERSION = 2
+HEADER_BYTES = 64
+LANGUAGES = ('english', 'hindi', 'mixed', 'other')
+COUNTERS = ('calls', 'successes', 'quality_sum', 'latency_sum', 'latency_count')
+LATENCY_BUCKET_MIN = -40   # ~1 microsecond at 4 buckets per octave
+LATENCY_BUCKET_COUNT = 121  # up to ~17 minutes
+RING_SIZE = 32
+TEXT_BYTES = 104
+
+RECORD_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('ts', '<f8'),
+    ('quality', '<f4'),
+    ('latency_ms', '<f4'),
+    ('success', 'u1'),
+    ('language', 'u1'),
+    ('text_len', '<u2'),
+    ('text', f'S{TEXT_BYTES}')
+], align=True)
+
+SLOT_DTYPE = np.dtype([
+    ('pid', '<i8'),
+    ('ring_head', '<i8'),
+    ('in_flight', '<i8'),
+    ('queued', '<i8'),
+    ('counters', '<f8', (len(COUNTERS),)),
+    ('language_calls', '<i8', (len(LANGUAGES),)),
+    ('quality_hist', '<i8', (101,)),
+    ('latency_hist', '<i8', (LATENCY_BUCKET_COUNT,)),
+    ('ring', RECORD_DTYPE, (RING_SIZE,))
+], align=True)
+
+HEADER_DTYPE = np.dtype([('magic', '<u8'), ('version', '<u4'), ('slots', '<u4')])
+
+
+def _segment_size(slots: int) -> int:
+    return HEADER_BYTES + SLOT_DTYPE.itemsize * slots
+
+
+def segment_name() -> str:
+    """Segment name shared by the gunicorn master and its workers"""
+    return os.getenv('SHARED_STATS_NAME') or f"bvs-stats-{os.getenv('API_PORT', 5000)}"
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    # The segment outlives any one worker: lifetime is managed explicitly via unlink(),
+    # not by the resource tracker (which would remove it when the first worker exits)
+    if os.name == 'posix':
+        resource_tracker.unregister(shm._name, 'shared_memory')
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedStats:
+    """
+    One worker's handle on the host-wide segment
+    record() touches only this worker's stripe under a process-local lock
+    (threads of one worker share the stripe); reads aggregate every stripe
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self._shm = shm
+        self.owner = owner
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)[0]
+        if header['magic'] != MAGIC or header['version'] != VERSION:
+            raise ValueError(f'Shared stats segment {shm.name} has an unexpected layout')
+        self.slots = np.ndarray((int(header['slots']),), dtype=SLOT_DTYPE, buffer=shm.buf, offset=HEADER_BYTES)
+        self._lock = threading.Lock()
+        self._slot_pid = None
+        self._creator_pid = os.getpid() if owner else None
+
+    @classmethod
+    def create(cls, name: str, slots: int = 64) -> 'SharedStats':
+        """Create a fresh segment, replacing a stale one left by a crashed server"""
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_segment_size(slots))
+        _untrack(shm)
+        return cls._initialize(shm, slots)
+
+    @classmethod
+    def _initialize(cls, shm: shared_memory.SharedMemory, slots: int, owner: bool = True) -> 'SharedStats':
+        shm.buf[:_segment_size(slots)] = bytes(_segment_size(slots))
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)
+        header['slots'] = slots
+        header['version'] = VERSION
+        header['magic'] = MAGIC
+        return cls(shm, owner=owner)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedStats':
+        shm = shared_memory.SharedMemory(name=name)
+        _untrack(shm)
+        return cls(shm)
+
+    @classmethod
+    def private(cls, slots: int = 64) -> 'SharedStats':
+        """Stats in an anonymous segment that no other process can attach to by name"""
+        shm = shared_memory.SharedMemory(create=True, size=_segment_size(slots))
+        # The mapping stays valid once the name is gone, so no exit path has to clean it up
+        shm.unlink()
+        return cls._initialize(shm, slots, owner=False)
+
+    @classmethod
+    def from_env(cls) -> 'SharedStats':
+        """
+        Attach to the segment named by SHARED_STATS_NAME (created by the gunicorn
+        master), or create it when running a single process
+        """
+        name = segment_name()
+        try:
+            return cls.attach(name)
+        except FileNotFoundError:
+            pass
+        if 'gunicorn' in sys.modules:
+            # Only the master may own the segment: a worker that created it would race its
+            # siblings and remove it from under them when recycled
+            logger.error(f"Shared stats segment {name} not found; start gunicorn with -c gunicorn.conf.py. "
+                         f"Falling back to per-worker stats")
+            return cls.private(int(os.getenv('SHARED_STATS_SLOTS', 64)))
+        stats = cls.create(name, int(os.getenv('SHARED_STATS_SLOTS', 64)))
+        atexit.register(stats.unlink)
+        logger.info(f"Created shared stats segment {name} for a single-process server")
+        return stats
+
+    def _claim_slot(self) -> int:
+        """This worker's stripe: its own, else a free or dead worker's (totals carry over)"""
+        pid = os.getpid()
+        lock_file = None
+        if fcntl is not None:
+            lock_file = open(os.path.join(tempfile.gettempdir(), f'{self._shm.name.lstrip("/")}.lock'), 'w')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            pids = self.slots['pid']
+            for index in range(len(self.slots)):
+                if pids[index] == pid:
+                    return index
+            for index in range(len(self.slots)):
+                if pids[index] == 0 or not _pid_alive(int(pids[index])):
+                    pids[index] = pid
+                    return index
+            raise RuntimeError(f'All {len(self.slots)} shared stats slots are in use; raise SHARED_STATS_SLOTS')
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _bind_slot(self):
+        index = self._claim_slot()
+        # Views into this worker's stripe, resolved once
+        self._counters = self.slots['counters'][index]
+        self._language_calls = self.slots['language_calls'][index]
+        self._quality_hist = self.slots['quality_hist'][index]
+        self._latency_hist = self.slots['latency_hist'][index]
+        self._ring_fields = {name: self.slots['ring'][index][name] for name in RECORD_DTYPE.names}
+        self._ring_head = self.slots['ring_head'][index:index + 1]
+        # Load is a live gauge, not a total: a reclaimed stripe must not keep its dead owner's
+        self._load = self.slots[['in_flight', 'queued']][index:index + 1]
+        self._load[0] = (0, 0)
+        self._slot_pid = os.getpid()
+
+    def record(self, ts: float, language: str, text: str, quality: float, success: bool,
+               latency_ms: Optional[float] = None):
+        """Add one call to this worker's stripe"""
+        language_index = LANGUAGES.index(language) if language in LANGUAGES else len(LANGUAGES) - 1
+        encoded = text.encode('utf-8')[:TEXT_BYTES]
+        with self._lock:
+            # Slots are claimed lazily so a forked worker never writes its parent's stripe
+            if self._slot_pid != os.getpid():
+                self._bind_slot()
+
+            counters = self._counters
+            counters[0] += 1
+            if success:
+                counters[1] += 1
+            counters[2] += quality
+            if latency_ms is not None:
+                counters[3] += latency_ms
+                counters[4] += 1
+                bucket = latency_bucket(latency_ms) - LATENCY_BUCKET_MIN
+                self._latency_hist[min(LATENCY_BUCKET_COUNT - 1, max(0, bucket))] += 1
+            self._language_calls[language_index] += 1
+            self._quality_hist[quality_bucket(quality)] += 1
+
+            # Seqlock: odd sequence while the payload is written, even again only after it
+            head = int(self._ring_head[0])
+            index = head % RING_SIZE
+            fields = self._ring_fields
+            seq = int(fields['seq'][index])
+            fields['seq'][index] = seq + 1
+            fields['ts'][index] = ts
+            fields['quality'][index] = quality
+            fields['latency_ms'][index] = latency_ms if latency_ms is not None else np.nan
+            fields['success'][index] = success
+            fields['language'][index] = language_index
+            fields['text_len'][index] = len(encoded)
+            fields['text'][index] = encoded
+            fields['seq'][index] = seq + 2
+            self._ring_head[0] = head + 1
+
+    def set_load(self, in_flight: int, queued: int):
+        """Publish this worker's admitted and queued request counts"""
+        with self._lock:
+            if self._slot_pid != os.getpid():
+                self._bind_slot()
+            self._load[0] = (in_flight, queued)
+
+    def host_load(self) -> int:
+        """Admitted plus queued requests across the live workers on this host"""
+        load = self.slots['in_flight'] + self.slots['queued']
+        pids = self.slots['pid']
+        return sum(int(load[index]) for index in np.flatnonzero(load) if _pid_alive(int(pids[index])))
+
+    def totals(self) -> Dict[str, Any]:
+        """Host-wide call totals in the performance_stats shape"""
+        counters = self.slots['counters'].sum(axis=0)
+        calls = counters[0]
+        return {
+            'total_calls': int(calls),
+            'avg_quality': float(counters[2] / calls) if calls else 0.0,
+            'success_rate': float(counters[1] / calls) if calls else 0.0
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals, per-language counts, percentiles and live worker count across the host"""
+        counters = self.slots['counters'].sum(axis=0)
+        latency_hist = self.slots['latency_hist'].sum(axis=0)
+        quality_hist = self.slots['quality_hist'].sum(axis=0)
+        pids = [int(pid) for pid in self.slots['pid'] if pid]
+        result = self.totals()
+        result.update({
+            'avg_latency_ms': round(float(counters[3] / counters[4]), 2) if counters[4] else None,
+            'by_language': dict(zip(LANGUAGES, (int(n) for n in self.slots['language_calls'].sum(axis=0)))),
+            'quality_percentiles': percentiles(
+                [(bucket, int(count)) for bucket, count in enumerate(quality_hist) if count], 'quality'),
+            'latency_ms_percentiles': percentiles(
+                [(bucket + LATENCY_BUCKET_MIN, int(count)) for bucket, count in enumerate(latency_hist) if count],
+                'latency_ms'),
+            'workers_reporting': sum(1 for pid in pids if _pid_alive(pid)),
+            'host_load': self.host_load()
+        })
+        return result
+
+    def recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recent calls across all workers, oldest first"""
+        records = []
+        for slot in self.slots:
+            for _ in range(3):
+                ring = slot['ring'].copy()
+                # Keep records whose sequence was even and unchanged across the copy
+                stable = (ring['seq'] % 2 == 0) & (ring['seq'] > 0) & (ring['seq'] == slot['ring']['seq'])
+                if stable.sum() == (ring['seq'] > 0).sum():
+                    break
+            records.extend(ring[stable])
+        records.sort(key=lambda record: record['ts'])
+        return [{
+            'timestamp': float(record['ts']),
+            'language': LANGUAGES[record['language']],
+            'text': record['text'][:record['text_len']].decode('utf-8', 'ignore'),
+            'quality': round(float(record['quality']), 4),
+            'latency_ms': None if np.isnan(record['latency_ms']) else round(float(record['latency_ms']), 2),
+            'success': bool(record['success'])
+        } for record in records[-limit:]]
+
+    def close(self):
+        self.slots = None
+        self._counters = self._language_calls = self._quality_hist = self._latency_hist = None
+        self._ring_fields = self._ring_head = self._load = None
+        self._shm.close()
+
+    def unlink(self):
+        """Remove the segment (server shutdown; creator process only)"""
+        if os.getpid() != self._creator_pid:
+            # Forked children inherit the creator's handle and atexit hooks
+            return
+        if os.name == 'posix':
+            # unlink() unregisters from the tracker, so register first to keep it balanced
+            resource_tracker.register(self._shm._name, 'shared_memory')
+        self._creator_pid = None
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
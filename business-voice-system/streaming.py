@@ -0,0 +1,163 @@
+"""
+Incremental Text-to-Speech for Streaming Dialog Output
+Detects stable phrase boundaries in arriving text and synthesizes each phrase immediately
+"""
+
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, List, Optional, Tuple
+
+# Sentence end only counts once the next character shows it is not "3.5" or "U.S.A"
+SENTENCE_END = re.compile(r'[.!?।॥]+["\')\]]*\s')
+CLAUSE_END = re.compile(r'[,;:—]\s')
+ABBREVIATIONS = frozenset(['mr.', 'mrs.', 'ms.', 'dr.', 'st.', 'no.', 'rs.', 'e.g.', 'i.e.', 'etc.', 'vs.'])
+
+
+class PhraseSegmenter:
+    """
+    Accumulates streamed text and releases phrases once their boundary is stable
+    Sentence ends split immediately; clause ends split once the phrase is long
+    enough to be worth a synthesis call; very long runs split at the last space
+    """
+
+    def __init__(self, min_clause_chars: int = 40, max_phrase_chars: int = 160):
+        self.min_clause_chars = min_clause_chars
+        self.max_phrase_chars = max_phrase_chars
+        self._buffer = ''
+        self._scan_from = 0
+
+    def _is_abbreviation(self, end: int) -> bool:
+        start = self._buffer.rfind(' ', 0, end) + 1
+        return self._buffer[start:end + 1].lower() in ABBREVIATIONS
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns phrases that are now complete"""
+        self._buffer += text
+        phrases = []
+        while True:
+            cut = None
+            for match in SENTENCE_END.finditer(self._buffer, self._scan_from):
+                if not self._is_abbreviation(match.start()):
+                    cut = match.end()
+                    break
+            if cut is None:
+                for match in CLAUSE_END.finditer(self._buffer, self._scan_from):
+                    if match.end() >= self.min_clause_chars:
+                        cut = match.end()
+                        break
+            if cut is None and len(self._buffer) > self.max_phrase_chars:
+                space = self._buffer.rfind(' ', 0, self.max_phrase_chars)
+                cut = space + 1 if space > 0 else self.max_phrase_chars
+            if cut is None:
+                # Only the tail can still complete a boundary on the next feed
+                self._scan_from = max(0, len(self._buffer) - 8)
+                return phrases
+
+            phrase = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:]
+            self._scan_from = 0
+            if phrase:
+                phrases.append(phrase)
+
+    def flush(self) -> Optional[str]:
+        """End of input: release whatever is left"""
+        phrase = self._buffer.strip()
+        self._buffer = ''
+        self._scan_from = 0
+        return phrase or None
+
+
+class StreamingSession:
+    """
+    One incremental synthesis session
+    Phrases are synthesized as soon as they are complete (up to max_parallel at once)
+    and delivered strictly in order through on_audio; cancel() drops everything pending
+    """
+
+    def __init__(self, synthesize: Callable[[str], Tuple[Optional[bytes], float]],
+                 on_audio: Callable[[int, str, bytes, float], None],
+                 on_error: Callable[[int, str, str], None],
+                 max_parallel: int = 2, segmenter: Optional[PhraseSegmenter] = None):
+        self.synthesize = synthesize
+        self.on_audio = on_audio
+        self.on_error = on_error
+        self.segmenter = segmenter or PhraseSegmenter()
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='stream-synth')
+        self._pending: Deque[Tuple[int, str, Future]] = deque()
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._generation = 0
+        self._closed = False
+        self.sent = 0
+        self._sender = threading.Thread(target=self._send_in_order, name='stream-sender', daemon=True)
+        self._sender.start()
+
+    def _submit(self, phrase: str):
+        with self._cond:
+            future = self._executor.submit(self.synthesize, phrase)
+            self._pending.append((self._seq, phrase, future))
+            self._seq += 1
+            self._cond.notify()
+
+    def push_text(self, text: str):
+        """Feed streamed text; complete phrases start synthesizing immediately"""
+        for phrase in self.segmenter.feed(text):
+            self._submit(phrase)
+
+    def flush(self):
+        """Synthesize the trailing partial phrase (end of a dialog turn)"""
+        phrase = self.segmenter.flush()
+        if phrase:
+            self._submit(phrase)
+
+    def cancel(self) -> int:
+        """Barge-in: drop buffered text and all undelivered phrases; returns phrases dropped"""
+        with self._cond:
+            self.segmenter.flush()
+            dropped = len(self._pending)
+            for _, _, future in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._generation += 1
+            self._cond.notify_all()
+        return dropped
+
+    def close(self, wait: bool = True):
+        """Stop after delivering (wait=True) or discarding pending phrases"""
+        if not wait:
+            self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._sender.join()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _send_in_order(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                seq, phrase, future = self._pending[0]
+                generation = self._generation
+
+            try:
+                audio_bytes, quality_score = future.result()
+                error = None if audio_bytes else 'Voice generation failed'
+            except Exception as e:
+                audio_bytes, quality_score, error = None, 0.0, str(e)
+
+            with self._cond:
+                # A cancel while we were waiting invalidates this phrase
+                if generation != self._generation:
+                    continue
+                self._pending.popleft()
+
+            if error:
+                self.on_error(seq, phrase, error)
+            else:
+                self.on_audio(seq, phrase, audio_bytes, quality_score)
+                self.sent += 1
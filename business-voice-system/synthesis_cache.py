@@ -0,0 +1,89 @@
+"""
+Synthesis Cache for Business Voice System
+Byte-bounded LRU of rendered audio keyed by normalized request
+"""
+
+import os
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of prompt text: NFC, trimmed, single spaces"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def request_key(text: str, language: str, **params: Any) -> str:
+    """Stable cache/routing key for a synthesis request"""
+    parts = [normalize_text(text), language.lower()]
+    # Numbers go through float() so pitch=1 and pitch=1.0 share a key
+    parts.extend(f'{name}={float(value) if isinstance(value, (int, float)) else value}'
+                 for name, value in sorted(params.items()) if value is not None)
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class SynthesisCache:
+    """
+    Thread-safe LRU cache of (audio_bytes, quality_score)
+    Bounded by total audio bytes rather than entry count
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> 'SynthesisCache':
+        """Build cache from environment settings"""
+        return cls(int(float(os.getenv('SYNTH_CACHE_MAX_MB', 256)) * 1024 * 1024))
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def peek(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Lookup that leaves hit/miss counts and LRU order alone (serving, not synthesis)"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, audio_bytes: bytes, quality_score: float):
+        if not audio_bytes or len(audio_bytes) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old[0])
+            self._entries[key] = (audio_bytes, quality_score)
+            self.current_bytes += len(audio_bytes)
+            while self.current_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
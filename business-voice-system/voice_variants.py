@@ -0,0 +1,71 @@
+"""
+Speaking-Rate, Pitch and Volume Variants for Business Voice System
+Derives variants from a cached base rendering with phase-vocoder DSP
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import librosa
+
+from audio_utils import decode_wav, encode_wav
+
+# Accepted request ranges
+RATE_RANGE = (0.5, 2.0)     # speed multiplier, 1.0 = base rendering
+PITCH_RANGE = (-12.0, 12.0)  # semitones
+VOLUME_RANGE = (0.0, 2.0)   # gain multiplier
+
+# Beyond these the vocoder smears transients audibly; re-synthesize instead
+SAFE_RATE_RANGE = (0.8, 1.25)
+SAFE_PITCH_SEMITONES = 3.0
+
+
+def validate_params(rate: float, pitch: float, volume: float) -> Optional[str]:
+    """Error message for out-of-range parameters, or None"""
+    for name, value, (low, high) in (('rate', rate, RATE_RANGE),
+                                     ('pitch', pitch, PITCH_RANGE),
+                                     ('volume', volume, VOLUME_RANGE)):
+        if not isinstance(value, (int, float)) or not low <= value <= high:
+            return f'{name} must be a number between {low} and {high}'
+    return None
+
+
+def is_default(rate: float, pitch: float, volume: float) -> bool:
+    return rate == 1.0 and pitch == 0.0 and volume == 1.0
+
+
+def within_safe_range(rate: float, pitch: float) -> bool:
+    """True if DSP on the base rendering is transparent enough for this change"""
+    return SAFE_RATE_RANGE[0] <= rate <= SAFE_RATE_RANGE[1] and abs(pitch) <= SAFE_PITCH_SEMITONES
+
+
+def apply_prosody(samples: np.ndarray, sample_rate: int, rate: float = 1.0, pitch: float = 0.0) -> np.ndarray:
+    """
+    Time-stretch by rate and shift by pitch semitones in one vocoder pass
+    Stretch by rate/ratio, then resample by ratio: duration scales by 1/rate, pitch by ratio
+    """
+    if rate == 1.0 and pitch == 0.0:
+        return samples
+    ratio = 2.0 ** (pitch / 12.0)
+    stretched = librosa.effects.time_stretch(samples, rate=rate / ratio)
+    if pitch == 0.0:
+        return stretched
+    return librosa.resample(stretched, orig_sr=sample_rate * ratio, target_sr=sample_rate, res_type='soxr_hq')
+
+
+def render_variant(audio_bytes: bytes, rate: float = 1.0, pitch: float = 0.0, volume: float = 1.0) -> bytes:
+    """Derive a rate/pitch/volume variant from base WAV bytes"""
+    samples, sample_rate = decode_wav(audio_bytes)
+    samples = apply_prosody(samples, sample_rate, rate, pitch)
+    if volume != 1.0:
+        samples = samples * volume
+    return encode_wav(samples, sample_rate)
+
+
+def variant_params(data: Dict) -> Dict[str, float]:
+    """Read rate/pitch/volume from a request body with defaults"""
+    return {
+        'rate': data.get('rate', 1.0),
+        'pitch': data.get('pitch', 0.0),
+        'volume': data.get('volume', 1.0)
+    }